@@ -1,54 +1,205 @@
-"""Opportunities listing endpoint."""
+"""Opportunities listing, search and export endpoints."""
 
-from fastapi import APIRouter, Query
+from datetime import date, datetime
+from typing import Optional
 
-from models.opportunity import get_opportunities_collection
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+
+from models.opportunity import find_opportunity, get_opportunities_collection
+from services import opportunity_cache, opportunity_dedup, opportunity_stats, opportunity_suggest
+from services.opportunity_cache import count_total, listing_base_query
+from services.opportunity_export import EXPORT_FORMATS, iter_export
+from services.opportunity_query import (
+    LISTING_SORT,
+    after_cursor,
+    build_search_match,
+    build_search_pipeline,
+    deadline_filter,
+    encode_cursor,
+    listing_projection,
+)
 
 router = APIRouter()
 
 
+async def _listing_filters(coll, view, fields, deadline_after, deadline_before) -> tuple[dict, dict]:
+    """(query, projection) shared by the listing and export. Raises HTTPException(400) on bad input."""
+    try:
+        projection = listing_projection(view, [f.strip() for f in fields.split(",") if f.strip()] if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = {**await listing_base_query(coll), **deadline_filter(deadline_after, deadline_before)}
+    return query, projection
+
+
 @router.get("")
 async def get_opportunities(
+    request: Request,
     limit: int = Query(default=50, ge=1, le=1000),
-    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description="nextCursor from the previous page."),
+    offset: int = Query(default=0, ge=0, deprecated=True, description="Use cursor; skip cost grows with offset."),
+    includeTotal: bool = Query(default=True, description="false skips counting; total is null."),
+    totalMode: str = Query(default="exact", pattern="^(exact|estimated)$"),
+    view: str = Query(default="full", pattern="^(full|summary)$", description="summary drops contacts, place and links."),
+    fields: Optional[str] = Query(default=None, description="Comma-separated fields; overrides view."),
+    deadlineAfter: Optional[datetime] = Query(default=None, description="responseDeadlineAt >= this (UTC if no offset)."),
+    deadlineBefore: Optional[datetime] = Query(default=None, description="responseDeadlineAt < this (UTC if no offset)."),
 ):
     """
     List opportunities with pagination.
-    Returns active opportunities sorted by postedDate (newest first).
+    Returns active opportunities sorted by postedAt (newest first).
     If no active opportunities, returns all opportunities.
+    Pass nextCursor back as cursor for the next page; offset is a deprecated fallback.
+    Totals are cached until the next sync write; totalMode=estimated uses collection metadata.
+    deadlineAfter/deadlineBefore filter on the parsed, indexed responseDeadlineAt.
+    The projection (and list defaults) run in Mongo and the page is serialized with orjson.
+    Responses carry a weak ETag (collection version + params); If-None-Match gets a 304
+    without querying, and repeat pages are served from an in-process LRU.
     """
+    version = await opportunity_cache.current_version()
+    key = opportunity_cache.params_key(request.query_params.multi_items())
+    etag = opportunity_cache.make_etag(version, key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if opportunity_cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    cached = opportunity_cache.get_page(version, key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json", headers=headers)
+
     coll = get_opportunities_collection()
+    query, projection = await _listing_filters(coll, view, fields, deadlineAfter, deadlineBefore)
     
-    # Build query - prefer active, but if none exist, return all
-    active_count = await coll.count_documents({"active": "Yes"})
-    if active_count > 0:
-        query = {"active": "Yes"}
-    else:
-        # Fallback: return all opportunities if no active ones
-        query = {}
-    
-    # Count total
-    total = await coll.count_documents(query)
+    # Keyset pagination on (postedAt, noticeId) when a cursor is given, else legacy skip
+    try:
+        page_query = after_cursor(query, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Fetch with pagination, sorted by postedDate descending
-    cursor = coll.find(query).sort("postedDate", -1).skip(offset).limit(limit)
-    items = await cursor.to_list(length=limit)
+    total = await count_total(coll, query, estimated=totalMode == "estimated") if includeTotal else None
     
-    # Convert ObjectId to string and clean up
-    for item in items:
-        if "_id" in item:
-            item["_id"] = str(item["_id"])
-        # Ensure all expected fields have defaults
-        if "naicsCodes" not in item:
-            item["naicsCodes"] = []
-        if "solicitationNumber" not in item:
-            item["solicitationNumber"] = item.get("solicitationNumber") or ""
-        if "typeOfSetAsideDescription" not in item:
-            item["typeOfSetAsideDescription"] = item.get("typeOfSetAsideDescription") or ""
+    find = coll.find(page_query, projection).sort(LISTING_SORT)
+    if not cursor and offset:
+        find = find.skip(offset)
+    items = await find.limit(limit).to_list(length=limit)
+    next_cursor = encode_cursor(items[-1]) if len(items) == limit else None
     
+    body = {
+        "items": items,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "nextCursor": next_cursor,
+    }
+    content = orjson.dumps(body, default=str)
+    opportunity_cache.put_page(version, key, content)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@router.get("/export")
+async def export_opportunities(
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(default=1000, ge=100, le=10000, description="Rows per Mongo batch and response chunk."),
+    view: str = Query(default="full", pattern="^(full|summary)$"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated fields; overrides view."),
+    deadlineAfter: Optional[datetime] = None,
+    deadlineBefore: Optional[datetime] = None,
+):
+    """
+    Stream every matching opportunity (same filters as the listing) as NDJSON or CSV.
+    Memory is bounded by batch_size, not by collection size.
+    """
+    coll = get_opportunities_collection()
+    query, projection = await _listing_filters(coll, view, fields, deadlineAfter, deadlineBefore)
+    return StreamingResponse(
+        iter_export(coll, query, projection, fmt=format, batch_size=batch_size),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="opportunities.{format}"'},
+    )
+
+
+@router.get("/suggest")
+async def suggest_opportunities(
+    q: str = Query(..., min_length=1, description="What the user has typed so far."),
+    limit: int = Query(default=opportunity_suggest.SUGGEST_LIMIT, ge=1, le=50),
+):
+    """
+    Typeahead: prefix matches on solicitation numbers, agency names and title words
+    (the earlier words of a multi-word q must match whole title words). Served from
+    the in-process index; nothing is scanned in Mongo.
+    """
+    return {"q": q, **await opportunity_suggest.suggest(q, limit)}
+
+
+@router.get("/stats")
+async def opportunity_stats_rollups(
+    dim: Optional[str] = Query(default=None, pattern="^(agency|naics|setAside|deadline)$"),
+    parent: Optional[str] = Query(default=None, description="Agency path whose sub-agencies to list, e.g. DEPT OF DEFENSE."),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    """
+    Counts of active opportunities by agency (one hierarchy level at a time), NAICS code,
+    set-aside and deadline month. Reads only the precomputed rollups that sync maintains.
+    """
+    return await opportunity_stats.read_stats(dim=dim, parent=parent, limit=limit)
+
+
+@router.get("/search")
+async def search_opportunities(
+    naics: Optional[list[str]] = Query(default=None, description="NAICS codes (any of)."),
+    setAside: Optional[list[str]] = Query(default=None, description="typeOfSetAside codes (any of)."),
+    agency: Optional[str] = Query(default=None, description="fullParentPathName prefix, e.g. DEPT OF DEFENSE."),
+    deadlineFrom: Optional[date] = None,
+    deadlineTo: Optional[date] = None,
+    q: Optional[str] = Query(default=None, description="Free text over titles; results ranked by text score."),
+    activeOnly: bool = True,
+    limit: int = Query(default=50, ge=1, le=200),
+    offset: int = Query(default=0, ge=0, le=5000),
+):
+    """
+    Server-side filtered search with facet counts (NAICS, set-aside, top-level agency)
+    computed in the same $facet aggregation as the page of items.
+    """
+    match = build_search_match(
+        naics=naics,
+        set_aside=setAside,
+        agency=agency,
+        deadline_from=deadlineFrom,
+        deadline_to=deadlineTo,
+        q=q,
+        active_only=activeOnly,
+    )
+    pipeline = build_search_pipeline(match, scored=bool(q), offset=offset, limit=limit)
+    result = (await get_opportunities_collection().aggregate(pipeline).to_list(length=1))[0]
+
+    items = result["items"]
+    total = result["total"][0]["n"] if result["total"] else 0
+
+    def facet(rows):
+        return [{"value": r["_id"], "count": r["count"]} for r in rows if r["_id"] not in (None, "")]
+
     return {
         "items": items,
         "total": total,
         "limit": limit,
         "offset": offset,
+        "facets": {
+            "naics": facet(result["naics"]),
+            "setAside": facet(result["setAside"]),
+            "agency": facet(result["agency"]),
+        },
     }
+
+
+# --- Per-notice routes (declared after the static paths above so /{noticeId} doesn't shadow them) ---
+
+
+@router.get("/{noticeId}/duplicates")
+async def get_duplicates(noticeId: str):
+    """Near-duplicate notices (amendments, re-posts) sharing this notice's duplicateClusterId."""
+    doc = await find_opportunity(noticeId, {"_id": 0, "noticeId": 1, "duplicateClusterId": 1})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Opportunity not found")
+    items = await opportunity_dedup.find_duplicates(doc)
+    return {"noticeId": noticeId, "clusterId": doc.get("duplicateClusterId"), "items": items}
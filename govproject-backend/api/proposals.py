@@ -1,11 +1,14 @@
 """Proposal / draft-proposal endpoints."""
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import Response
 
-from models.opportunity import get_opportunities_collection
+from models.opportunity import find_opportunity
 from models.user_profile import get_user_profiles_collection
 from schemas.api_schemas import DraftProposalRequest, RefineDraftRequest, DownloadPdfRequest
+from services.opportunity_descriptions import get_description
 from services.proposal_service import get_proposal_details, refine_draft, build_context
 from services.pdf_generator import generate_pdf
 from rag.retrieve import retrieve
@@ -15,31 +18,30 @@ router = APIRouter()
 
 @router.post("")
 async def draft_proposal(req: DraftProposalRequest):
-    opp = await get_opportunities_collection().find_one({"noticeId": req.noticeId})
+    opp = await find_opportunity(req.noticeId)
     profile = await get_user_profiles_collection().find_one({"companyId": req.companyId})
     if not opp:
         raise HTTPException(status_code=404, detail="Opportunity not found")
     if not profile:
         raise HTTPException(status_code=404, detail="User profile not found")
-    return await get_proposal_details(opp, profile, include_draft=req.includeDraft)
+    try:
+        return await get_proposal_details(opp, profile, include_draft=req.includeDraft)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Draft generation timed out")
 
 
 @router.post("/refine")
 async def refine_proposal(req: RefineDraftRequest):
     """Refine an existing draft based on user feedback."""
-    opp = await get_opportunities_collection().find_one({"noticeId": req.noticeId})
+    opp = await find_opportunity(req.noticeId)
     profile = await get_user_profiles_collection().find_one({"companyId": req.companyId})
     if not opp:
         raise HTTPException(status_code=404, detail="Opportunity not found")
     if not profile:
         raise HTTPException(status_code=404, detail="User profile not found")
     
-    # Fetch full description text
-    from services.proposal_service import fetch_description_text
-    description_text = ""
-    description_url = opp.get("description")
-    if description_url:
-        description_text = await fetch_description_text(description_url)
+    # Full description text (stored; fetched and stored now if the prefetch hasn't reached it)
+    description_text = await get_description(opp)
     
     # Retrieve RAG chunks for context
     notice_id = opp.get("noticeId") or ""
@@ -74,7 +76,7 @@ async def refine_proposal(req: RefineDraftRequest):
 @router.post("/download-pdf")
 async def download_pdf(req: DownloadPdfRequest):
     """Generate and download proposal draft as PDF."""
-    opp = await get_opportunities_collection().find_one({"noticeId": req.noticeId})
+    opp = await find_opportunity(req.noticeId)
     profile = await get_user_profiles_collection().find_one({"companyId": req.companyId})
     if not opp:
         raise HTTPException(status_code=404, detail="Opportunity not found")
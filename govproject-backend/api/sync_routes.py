@@ -1,16 +1,28 @@
-"""Sync endpoints."""
+"""Sync endpoints. Syncs run as background jobs; POST starts one, GET reports its progress."""
 
-from fastapi import APIRouter, HTTPException
+from typing import Optional
 
-from sync import run_sync
+from fastapi import APIRouter, HTTPException, Query
+
+from services.sync_jobs import get_sync_job, start_sync_job
 
 router = APIRouter()
 
 
-@router.post("")
-async def sync():
+@router.post("", status_code=202)
+async def sync(window: Optional[str] = Query(default=None, pattern="^(day|week)$")):
+    """Enqueue a sync job, or return the job already running (jobId null, heldBy "archive" during an archive run)."""
     try:
-        total = await run_sync()
-        return {"synced": total}
+        job, created = await start_sync_job(window=window)
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
+    return {**job, "created": created}
+
+
+@router.get("/{job_id}")
+async def sync_status(job_id: str):
+    """Pages done, inserted/updated/unchanged counts, records/sec and errors for a sync job."""
+    job = await get_sync_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
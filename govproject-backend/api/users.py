@@ -1,13 +1,27 @@
 """User profile endpoints."""
 
+import logging
 import re
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
 
 from models.user_profile import UserProfile, ensure_indexes, get_user_profiles_collection
+from services.matching import match_opportunities
+from services.recommendations import FEED_SIZE, get_feed, rebuild_feed
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+async def _rebuild_feed_quietly(profile: dict) -> None:
+    """Background feed rebuild after a profile write. Failures are logged, not raised: the profile
+    is already saved, and GET /recommendations rebuilds a missing feed on first read."""
+    try:
+        await rebuild_feed(profile)
+    except Exception:
+        logger.exception("Recommendation feed rebuild failed for %s", profile.get("companyId"))
+
+
 def generate_company_id(company_name: str) -> str:
     """Generate a companyId from company name."""
     # Convert to lowercase, remove special chars, replace spaces with hyphens
@@ -23,7 +37,7 @@ def generate_company_id(company_name: str) -> str:
 
 
 @router.post("")
-async def create_user(profile: UserProfile):
+async def create_user(profile: UserProfile, background_tasks: BackgroundTasks):
     await ensure_indexes()
     doc = profile.to_mongo()
     coll = get_user_profiles_collection()
@@ -45,4 +59,44 @@ async def create_user(profile: UserProfile):
         raise HTTPException(status_code=400, detail=f"Company ID '{doc['companyId']}' already exists. Please choose a different one.")
     
     result = await coll.insert_one(doc)
+    background_tasks.add_task(_rebuild_feed_quietly, doc)
     return {"companyId": doc["companyId"], "message": "created"}
+
+
+@router.put("/{companyId}")
+async def update_user(companyId: str, profile: UserProfile, background_tasks: BackgroundTasks):
+    """Replace a company profile; its recommendation feed is rebuilt after the response."""
+    coll = get_user_profiles_collection()
+    existing = await coll.find_one({"companyId": companyId}, {"createdAt": 1})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Company profile not found")
+    doc = profile.to_mongo()
+    doc["companyId"] = companyId
+    if existing.get("createdAt"):
+        doc["createdAt"] = existing["createdAt"]
+    await coll.replace_one({"companyId": companyId}, doc)
+    background_tasks.add_task(_rebuild_feed_quietly, doc)
+    return {"companyId": companyId, "message": "updated"}
+
+
+@router.get("/{companyId}/matches")
+async def get_matches(companyId: str, limit: int = Query(20, ge=1, le=200)):
+    """Best-matching active opportunities for a company, scored against the in-memory matrix."""
+    profile = await get_user_profiles_collection().find_one({"companyId": companyId}, {"_id": 0})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Company profile not found")
+    items = await match_opportunities(profile, limit=limit)
+    return {"companyId": companyId, "items": items}
+
+
+@router.get("/{companyId}/recommendations")
+async def get_recommendations(companyId: str, limit: int = Query(20, ge=1, le=FEED_SIZE)):
+    """Materialized recommendation feed (one indexed read). Built on first request for older profiles."""
+    feed = await get_feed(companyId, limit)
+    if not feed:
+        profile = await get_user_profiles_collection().find_one({"companyId": companyId}, {"_id": 0})
+        if not profile:
+            raise HTTPException(status_code=404, detail="Company profile not found")
+        await rebuild_feed(profile)
+        feed = await get_feed(companyId, limit)
+    return feed
@@ -1,5 +1,6 @@
 """API and service clients for the project."""
 
 from .gemini_client import GeminiClient
+from .sam_client import SamSearchClient
 
-__all__ = ["GeminiClient"]
+__all__ = ["GeminiClient", "SamSearchClient"]
@@ -0,0 +1,163 @@
+"""
+SAM.gov Get Opportunities client — paginated search with bounded concurrency.
+
+The first page tells us totalRecords; the remaining offsets are fetched by a
+small pool of workers that share one requests-per-second budget and back off
+on 429/5xx. Pages are handed to the caller through an asyncio.Queue so writes
+can run while the next pages download.
+
+Usage:
+    from clients.sam_client import SamSearchClient
+
+    async with SamSearchClient(api_key) as sam:
+        queue = asyncio.Queue(maxsize=8)
+        producer = asyncio.create_task(sam.fetch_pages("01/01/2025", "01/31/2025", queue))
+        while (page := await queue.get()) is not None:
+            offset, records = page
+            ...
+        await producer
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+
+import httpx
+
+BASE_URL = "https://api.sam.gov/opportunities/v2/search"
+PAGE_SIZE = 1000
+DEFAULT_MAX_RPS = float(os.getenv("SAM_MAX_RPS", "4"))
+DEFAULT_CONCURRENCY = int(os.getenv("SAM_CONCURRENCY", "4"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SamSearchClient:
+    """Async SAM.gov search client with a shared rate limit and retry/backoff."""
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        max_rps: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        max_retries: int = 5,
+        timeout: float = 60.0,
+    ):
+        if not api_key:
+            raise ValueError("SAM_API_KEY not set")
+        self._api_key = api_key
+        self._min_interval = 1.0 / (max_rps or DEFAULT_MAX_RPS)
+        self._concurrency = max(1, concurrency or DEFAULT_CONCURRENCY)
+        self._max_retries = max_retries
+        self._timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._rate_lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def __aenter__(self) -> "SamSearchClient":
+        limits = httpx.Limits(max_connections=self._concurrency, max_keepalive_connections=self._concurrency)
+        self._client = httpx.AsyncClient(timeout=self._timeout, limits=limits)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _throttle(self) -> None:
+        """Wait for the next request slot so all workers together stay under max_rps."""
+        async with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Exponential backoff with full jitter; honours Retry-After when SAM sends one."""
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after) + random.uniform(0, 1)
+        return random.uniform(0, min(60.0, 2.0 ** attempt))
+
+    async def fetch_page(self, posted_from: str, posted_to: str, offset: int, limit: int = PAGE_SIZE) -> dict:
+        """GET one search page; retries 429/5xx and transport errors, raises after max_retries."""
+        params = {
+            "api_key": self._api_key,
+            "postedFrom": posted_from,
+            "postedTo": posted_to,
+            "limit": limit,
+            "offset": offset,
+        }
+        for attempt in range(self._max_retries + 1):
+            await self._throttle()
+            try:
+                res = await self._client.get(BASE_URL, params=params)
+            except httpx.TransportError:
+                if attempt == self._max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if res.status_code in RETRY_STATUSES and attempt < self._max_retries:
+                await asyncio.sleep(self._backoff(attempt, res))
+                continue
+            res.raise_for_status()
+            return res.json()
+        raise RuntimeError("unreachable")
+
+    async def fetch_pages(
+        self,
+        posted_from: str,
+        posted_to: str,
+        queue: asyncio.Queue,
+        *,
+        start_offset: int = 0,
+        limit: int = PAGE_SIZE,
+    ) -> int:
+        """
+        Put (offset, records) for every page of the window onto queue, then None.
+        Pages after the first arrive in completion order, not offset order; empty
+        pages are still put so callers can track which offsets are done.
+        Returns totalRecords as reported by SAM.
+        """
+        cancelled = False
+        try:
+            first = await self.fetch_page(posted_from, posted_to, start_offset, limit)
+            total = int(first.get("totalRecords") or 0)
+            records = first.get("opportunitiesData") or []
+            await queue.put((start_offset, records))
+            if len(records) < limit:
+                return total
+
+            offsets = iter(range(start_offset + limit, total, limit))
+
+            async def worker():
+                for offset in offsets:
+                    data = await self.fetch_page(posted_from, posted_to, offset, limit)
+                    await queue.put((offset, data.get("opportunitiesData") or []))
+
+            workers = [asyncio.create_task(worker()) for _ in range(self._concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                for w in workers:
+                    w.cancel()
+                raise
+            return total
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            if cancelled:
+                # Cancelled by a consumer that stopped reading: blocking on a full queue
+                # would leave this task pending forever, so the sentinel is best-effort.
+                try:
+                    queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    pass
+            else:
+                await queue.put(None)
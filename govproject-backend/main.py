@@ -6,12 +6,34 @@ All routes and request models live under api/ and schemas/.
 from dotenv import load_dotenv
 load_dotenv()
 
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api import router as api_router
+from services import opportunity_suggest
+from services.attachments import close_http_client
+from services.sync_jobs import start_scheduler, stop_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        logger.info("[SUGGEST] Indexed %d opportunities", await opportunity_suggest.build())
+    except Exception:
+        # Serve anyway; the index is built on the first /opportunities/suggest request.
+        logger.exception("[SUGGEST] Startup index build failed")
+    start_scheduler()
+    yield
+    await stop_scheduler()
+    await close_http_client()
+
 
-app = FastAPI(title="GovPreneurs API", version="1.0.0")
+app = FastAPI(title="GovPreneurs API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -28,6 +50,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 app.include_router(api_router)
@@ -3,10 +3,14 @@ MongoDB persistence for GovPreneurs opportunities.
 Schema matches schemas/govpreneurs_opportunity.schema.json (minimal).
 """
 
-from datetime import datetime
+import hashlib
+from datetime import datetime, timezone
 from typing import Optional
 
-from pydantic import BaseModel, Field
+import orjson
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
 
 
 # --- Nested types (trimmed) ---
@@ -59,12 +63,22 @@ class GovPreneursOpportunity(BaseModel):
     naicsCodes: list[str] = Field(default_factory=list)
     active: Optional[str] = None  # "Yes" | "No"
     description: Optional[str] = None # ex : https://api.sam.gov/prod/opportunities/v1/noticedesc?noticeid=f85ff581f08d4d408ae0214beb569d95&api_key=SAM-XXXXXX  we have to add api_key at the end 
-    scopeOfWorkText: Optional[str] = None
+    scopeOfWorkText: Optional[str] = None  # noticedesc text (services/opportunity_descriptions.py)
+    descriptionFetchedAt: Optional[datetime] = None  # set once fetched, even if SAM had no text
     resourceLinks: Optional[list[str]] = None
     pointOfContact: Optional[list[PointOfContact]] = None
     placeOfPerformance: Optional[PlaceOfPerformance] = None
     uiLink: Optional[str] = None
     ingestedAt: Optional[str] = None  # ISO 8601; set on insert/update
+    # Parsed from the raw SAM strings above (which mix formats) so sorts and ranges are by time.
+    postedAt: Optional[datetime] = None
+    responseDeadlineAt: Optional[datetime] = None
+    archiveAt: Optional[datetime] = None
+    contentHash: Optional[str] = None  # sha256 of the SAM-derived fields; unchanged hash => write skipped
+    # Near-duplicate detection (services/opportunity_dedup.py); derived, so not part of contentHash.
+    minhash: Optional[list[int]] = None
+    lshBands: Optional[list[str]] = None
+    duplicateClusterId: Optional[str] = None
 
     model_config = {"extra": "forbid"}
 
@@ -78,9 +92,148 @@ class GovPreneursOpportunity(BaseModel):
         return cls.model_validate(doc)
 
 
+# --- SAM.gov mapping and page validation ---
+
+# Scalar fields copied verbatim from a SAM.gov search record.
+SAM_KEYS = (
+    "noticeId", "title", "postedDate", "solicitationNumber", "fullParentPathName",
+    "type", "archiveDate", "typeOfSetAside", "typeOfSetAsideDescription", "responseDeadLine",
+    "naicsCode", "active", "description", "uiLink",
+)
+REQUIRED_KEYS = ("noticeId", "title", "postedDate")
+# Raw SAM date string -> parsed BSON datetime field stored next to it.
+DATE_FIELDS = {"postedDate": "postedAt", "responseDeadLine": "responseDeadlineAt", "archiveDate": "archiveAt"}
+_DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M %p")  # non-ISO forms seen in SAM
+
+_PAGE_ADAPTER = TypeAdapter(list[GovPreneursOpportunity])
+
+
+def _code_name(v) -> Optional[dict]:
+    return {"code": v.get("code"), "name": v.get("name")} if isinstance(v, dict) else None
+
+
+def parse_sam_date(value) -> Optional[datetime]:
+    """Parse the date formats SAM.gov mixes (ISO date, ISO datetime with offset, MM/DD/YYYY) to UTC."""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        for fmt in _DATE_FORMATS:
+            try:
+                dt = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def with_parsed_dates(o: dict) -> dict:
+    """Set postedAt / responseDeadlineAt / archiveAt from the raw strings (in place)."""
+    for raw, parsed in DATE_FIELDS.items():
+        o[parsed] = parse_sam_date(o.get(raw))
+    return o
+
+
+def from_sam(sam: dict) -> dict:
+    """Map one SAM.gov search record to an opportunity dict (the only copy of this mapping)."""
+    o = {k: sam.get(k) for k in SAM_KEYS}
+    o["naicsCodes"] = [str(c) for c in sam.get("naicsCodes") or []]
+    links = sam.get("resourceLinks")
+    o["resourceLinks"] = [str(u) for u in links] if links else None
+    if sam.get("pointOfContact"):
+        o["pointOfContact"] = [
+            {"fullName": p.get("fullName"), "email": p.get("email"), "phone": p.get("phone")}
+            for p in sam["pointOfContact"]
+        ]
+    if sam.get("placeOfPerformance"):
+        p = sam["placeOfPerformance"]
+        o["placeOfPerformance"] = {
+            "city": {"name": (p.get("city") or {}).get("name")},
+            "state": _code_name(p.get("state")),
+            "country": _code_name(p.get("country")),
+        }
+    return with_parsed_dates(o)
+
+
+def _drop_none(v):
+    """Same shape as model_dump(exclude_none=True) for the plain dicts/lists from_sam builds."""
+    if isinstance(v, dict):
+        return {k: _drop_none(x) for k, x in v.items() if x is not None}
+    if isinstance(v, list):
+        return [_drop_none(x) for x in v]
+    return v
+
+
+def _check_trusted(o: dict) -> Optional[str]:
+    """Cheap checks for a from_sam() dict: required keys present, passthrough scalars are strings."""
+    for k in REQUIRED_KEYS:
+        if not isinstance(o.get(k), str):
+            return f"{k}: required string"
+    for k in SAM_KEYS:
+        v = o.get(k)
+        if v is not None and not isinstance(v, str):
+            return f"{k}: expected string, got {type(v).__name__}"
+    return None
+
+
+def validate_page(records: list[dict], *, trusted: bool = False) -> tuple[list[dict], list[dict]]:
+    """
+    Validate a page of opportunity dicts in one pass; returns (mongo_docs, failed).
+    Default: one TypeAdapter(list[GovPreneursOpportunity]) call for the whole page.
+    trusted=True is for dicts produced by from_sam(): the nested fields it built are
+    not re-validated, only required keys and passthrough scalar types are checked.
+    """
+    failed = []
+    if trusted:
+        docs = []
+        for o in records:
+            err = _check_trusted(o)
+            if err:
+                failed.append({"noticeId": o.get("noticeId"), "error": err})
+            else:
+                docs.append(_drop_none(o))
+        return docs, failed
+
+    try:
+        models = _PAGE_ADAPTER.validate_python(records)
+    except ValidationError as e:
+        errors = {}
+        for err in e.errors():
+            idx = err["loc"][0] if err["loc"] else None
+            field = ".".join(str(x) for x in err["loc"][1:])
+            errors.setdefault(idx, []).append(f"{field}: {err['msg']}")
+        for idx, msgs in errors.items():
+            rec = records[idx] if isinstance(idx, int) and isinstance(records[idx], dict) else {}
+            failed.append({"noticeId": rec.get("noticeId"), "error": "; ".join(msgs)})
+        models = _PAGE_ADAPTER.validate_python([r for i, r in enumerate(records) if i not in errors])
+    return _PAGE_ADAPTER.dump_python(models, exclude_none=True), failed
+
+
+# --- Change detection ---
+
+# Bookkeeping fields that must not affect whether a notice "changed".
+HASH_EXCLUDE = frozenset({
+    "_id", "ingestedAt", "contentHash", "minhash", "lshBands", "duplicateClusterId",
+    "scopeOfWorkText", "descriptionFetchedAt",
+})
+
+
+def content_hash(doc: dict) -> str:
+    """Stable fingerprint of an opportunity document (key order independent)."""
+    payload = {k: v for k, v in doc.items() if k not in HASH_EXCLUDE}
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
 # --- Collection and indexes ---
 
 COLLECTION_NAME = "opportunities"
+ARCHIVE_COLLECTION_NAME = "opportunities_archive"  # cold tier: inactive / past archiveDate (services/opportunity_archive.py)
 
 
 def get_opportunities_collection():
@@ -88,6 +241,19 @@ def get_opportunities_collection():
     return db[COLLECTION_NAME]
 
 
+def get_archive_collection():
+    from db import db
+    return db[ARCHIVE_COLLECTION_NAME]
+
+
+async def find_opportunity(notice_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+    """One opportunity by noticeId: the hot collection first, then the archive."""
+    doc = await get_opportunities_collection().find_one({"noticeId": notice_id}, projection)
+    if doc is None:
+        doc = await get_archive_collection().find_one({"noticeId": notice_id}, projection)
+    return doc
+
+
 async def ensure_indexes():
     """Create indexes for queries and upserts. Idempotent."""
     coll = get_opportunities_collection()
@@ -97,13 +263,29 @@ async def ensure_indexes():
     await coll.create_index("responseDeadLine")
     await coll.create_index("typeOfSetAside")
     await coll.create_index("naicsCodes")
+    await coll.create_index("fullParentPathName")  # agency prefix search
     await coll.create_index([("active", 1), ("responseDeadLine", 1)])
+    # Deadline-window queries on the parsed datetime
+    await coll.create_index("responseDeadlineAt")
+    await coll.create_index([("active", 1), ("responseDeadlineAt", 1)])
+    # Keyset pagination for GET /opportunities (sort postedAt desc, noticeId desc)
+    await coll.create_index([("active", 1), ("postedAt", -1), ("noticeId", -1)])
+    await coll.create_index([("postedAt", -1), ("noticeId", -1)])
     await coll.create_index([("title", "text")], default_language="english")
+    await coll.create_index("ingestedAt")  # incremental analytics snapshots
+    await coll.create_index("archiveAt")  # archiver: past-archiveDate notices
+    await coll.create_index("lshBands")  # near-duplicate candidates
+    await coll.create_index("duplicateClusterId", sparse=True)
+    archive = get_archive_collection()
+    await archive.create_index("noticeId", unique=True)
+    await archive.create_index("archivedAt")
+    await archive.create_index("duplicateClusterId", sparse=True)
 
 
 async def upsert_opportunity(data: dict) -> str:
-    """Insert or replace by noticeId; set ingestedAt. Returns noticeId."""
+    """Insert or replace by noticeId; set ingestedAt and contentHash. Returns noticeId."""
     doc = GovPreneursOpportunity.model_validate(data).to_mongo()
+    doc["contentHash"] = content_hash(doc)
     doc["ingestedAt"] = datetime.utcnow().isoformat() + "Z"
     coll = get_opportunities_collection()
     await coll.replace_one(
@@ -112,3 +294,60 @@ async def upsert_opportunity(data: dict) -> str:
         upsert=True,
     )
     return doc["noticeId"]
+
+
+async def bulk_upsert_opportunities(
+    records: list[dict],
+    *,
+    trusted: bool = False,
+    previous_fields: tuple[str, ...] = (),
+) -> dict:
+    """
+    Validate a page of opportunities (see validate_page; pass trusted=True for from_sam() output)
+    and replace changed ones by noticeId in one unordered bulk_write.
+    Stored contentHash values for the page are read with a single $in query; records whose hash
+    matches are skipped, so ingestedAt only moves when SAM actually changed the notice.
+    previous_fields are read in the same query and returned for replaced documents, so callers
+    maintaining derived data (rollups) see the old values without another round trip.
+    Returns {"inserted", "updated", "unchanged", "changed": [noticeId written, ...],
+    "previous": {noticeId: {field: old value}} (replaced notices only), "failed": [{"noticeId", "error"}, ...]}.
+    """
+    valid, failed = validate_page(records, trusted=trusted)
+    docs = {}
+    for doc in valid:
+        doc["contentHash"] = content_hash(doc)
+        docs[doc["noticeId"]] = doc  # SAM can repeat a notice within a page; last one wins
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not docs:
+        return {**counts, "changed": [], "previous": {}, "failed": failed}
+
+    coll = get_opportunities_collection()
+    projection = {"_id": 0, "noticeId": 1, "contentHash": 1, **{f: 1 for f in previous_fields}}
+    existing = {d["noticeId"]: d async for d in coll.find({"noticeId": {"$in": list(docs)}}, projection)}
+    stored = {notice_id: d.get("contentHash") for notice_id, d in existing.items()}
+
+    ops = []
+    ids = []
+    ingested_at = datetime.utcnow().isoformat() + "Z"
+    for notice_id, doc in docs.items():
+        if notice_id in stored and stored[notice_id] == doc["contentHash"]:
+            counts["unchanged"] += 1
+            continue
+        doc["ingestedAt"] = ingested_at
+        ops.append(ReplaceOne({"noticeId": notice_id}, doc, upsert=True))
+        ids.append(notice_id)
+
+    failed_idx = set()
+    if ops:
+        try:
+            await coll.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors") or []:
+                failed_idx.add(err["index"])
+                failed.append({"noticeId": ids[err["index"]], "error": err.get("errmsg", "")})
+    changed = [notice_id for i, notice_id in enumerate(ids) if i not in failed_idx]
+    for notice_id in changed:
+        counts["updated" if notice_id in stored else "inserted"] += 1
+    previous = {notice_id: existing[notice_id] for notice_id in changed if notice_id in existing} if previous_fields else {}
+    return {**counts, "changed": changed, "previous": previous, "failed": failed}
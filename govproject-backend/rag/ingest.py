@@ -2,6 +2,7 @@
 Ingest: list files in downloads/<notice_id>/, parse, chunk, embed, upsert to Pinecone.
 """
 
+import asyncio
 import os
 from pathlib import Path
 
@@ -72,7 +73,9 @@ async def run_ingest(
         logger.warning(f"[INGEST] Directory not found: {dir_path}")
         return 0
 
-    store = _get_store()
+    # Parsing, chunking and the vector store calls block; worker threads keep the event loop
+    # (and the caller's timeout) responsive while they run.
+    store = await asyncio.to_thread(_get_store)
     docs = []
     total_chunks_created = 0
     
@@ -92,13 +95,14 @@ async def run_ingest(
             continue
         try:
             logger.info(f"[INGEST] Parsing file: {name}")
-            text = parse_file(str(path))
+            text = await asyncio.to_thread(parse_file, str(path))
             logger.info(f"[INGEST] Parsed {name}: {len(text)} characters")
         except Exception as e:
             logger.error(f"[INGEST] Parse failed for {path}: {e}", exc_info=True)
             raise RuntimeError(f"Parse failed for {path}: {e}") from e
         
-        chunks = chunk_by_structure(
+        chunks = await asyncio.to_thread(
+            chunk_by_structure,
             text,
             metadata={"noticeId": notice_id, "filename": name},
             min_tokens=400,
@@ -155,7 +159,7 @@ async def run_ingest(
         return 0
     
     logger.info(f"[INGEST] Upserting {len(docs)} documents to Pinecone...")
-    store.upsert_documents(docs)
+    await asyncio.to_thread(store.upsert_documents, docs)
     logger.info(f"[INGEST] Successfully upserted {len(docs)} documents to Pinecone")
     return len(docs)
 
@@ -2,6 +2,8 @@
 Retrieval: query vector store, return top-k chunks with text for RAG context.
 """
 
+import asyncio
+
 
 async def retrieve(query_text: str, top_k: int = 5, notice_id: str | None = None) -> list[dict]:
     """
@@ -13,8 +15,9 @@ async def retrieve(query_text: str, top_k: int = 5, notice_id: str | None = None
     import logging
     logger = logging.getLogger(__name__)
     
-    store = _get_store()
-    result = store.query(query_text, top_k=top_k * 2)
+    # The vector store client blocks; run it in a worker thread so the event loop keeps serving.
+    store = await asyncio.to_thread(_get_store)
+    result = await asyncio.to_thread(store.query, query_text, top_k=top_k * 2)
     matches = result.get("matches") or []
     logger.info(f"[CITATIONS] Retrieved {len(matches)} matches from Pinecone for query: {query_text[:50]}")
     
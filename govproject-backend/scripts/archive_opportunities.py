@@ -0,0 +1,93 @@
+"""
+Run the hot/cold archiver once and report what it bought.
+
+Before and after moving inactive / past-archiveDate notices to opportunities_archive,
+prints the hot collection's document count, data size and index sizes (collStats),
+and the median latency of the default listing page and its active count, measured
+with the same query helpers GET /opportunities uses.
+
+Usage:
+    python scripts/archive_opportunities.py [--dry-run]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from db import db
+from models.opportunity import COLLECTION_NAME, ensure_indexes, get_opportunities_collection
+from services.opportunity_archive import archive_query
+from services.opportunity_cache import ACTIVE_QUERY
+from services.opportunity_query import LISTING_SORT, listing_projection
+from services.sync_jobs import run_archive_job
+
+REPEATS = 15
+PAGE = 50
+
+
+async def _median_ms(fn) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+async def measure() -> dict:
+    coll = get_opportunities_collection()
+    stats = await db.command("collStats", COLLECTION_NAME)
+    projection = listing_projection("full")
+    return {
+        "count": stats.get("count", 0),
+        "sizeMB": stats.get("size", 0) / 2**20,
+        "indexMB": stats.get("totalIndexSize", 0) / 2**20,
+        "indexSizes": {k: v / 2**20 for k, v in (stats.get("indexSizes") or {}).items()},
+        "listingMs": await _median_ms(
+            lambda: coll.find(ACTIVE_QUERY, projection).sort(LISTING_SORT).limit(PAGE).to_list(length=PAGE)
+        ),
+        "countMs": await _median_ms(lambda: coll.count_documents(ACTIVE_QUERY)),
+    }
+
+
+def report(label: str, m: dict):
+    print(f"{label}: {m['count']} docs, data {m['sizeMB']:.1f} MB, indexes {m['indexMB']:.1f} MB, "
+          f"listing page {m['listingMs']:.1f} ms, active count {m['countMs']:.1f} ms")
+    for name, mb in sorted(m["indexSizes"].items(), key=lambda kv: -kv[1]):
+        print(f"    {name:<45} {mb:8.2f} MB")
+
+
+async def main():
+    await ensure_indexes()
+    before = await measure()
+    report("Before", before)
+    archivable = await get_opportunities_collection().count_documents(archive_query(datetime.now(timezone.utc)))
+    print(f"Archivable: {archivable}")
+    if "--dry-run" in sys.argv or not archivable:
+        return
+
+    started = time.perf_counter()
+    result = await run_archive_job()
+    if result is None:
+        print("A sync holds the lease; try again later.")
+        return
+    print(f"Moved {result['moved']} in {result['batches']} batches ({time.perf_counter() - started:.1f}s)")
+    # WiredTiger reuses freed index pages but only returns them to the OS on compact,
+    # so totalIndexSize can shrink by less than the share of entries removed.
+    after = await measure()
+    report("After", after)
+    print(f"Index size {before['indexMB']:.1f} -> {after['indexMB']:.1f} MB; "
+          f"listing {before['listingMs']:.1f} -> {after['listingMs']:.1f} ms; "
+          f"count {before['countMs']:.1f} -> {after['countMs']:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""
+Compute MinHash / LSH signatures for opportunities stored before near-duplicate
+detection existed, then link duplicate clusters across the whole hot collection.
+Sync maintains both for notices it writes; this covers the rest. Safe to re-run.
+
+Usage:
+    python scripts/backfill_duplicate_clusters.py [batch_size]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+load_dotenv()
+from models.opportunity import ensure_indexes, get_opportunities_collection
+from services import opportunity_cache
+from services.opportunity_dedup import assign_clusters, with_signature
+
+TEXT_FIELDS = {"_id": 0, "noticeId": 1, "title": 1, "solicitationNumber": 1}
+
+
+async def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    await ensure_indexes()
+    coll = get_opportunities_collection()
+    started = time.perf_counter()
+
+    # Pass 1: signatures for every notice, so pass 2 sees all candidates.
+    signed = 0
+    ops = []
+    async for doc in coll.find({"minhash": {"$exists": False}}, TEXT_FIELDS).batch_size(batch_size):
+        with_signature(doc)
+        if "minhash" in doc:
+            ops.append(UpdateOne({"noticeId": doc["noticeId"]}, {"$set": {"minhash": doc["minhash"], "lshBands": doc["lshBands"]}}))
+        if len(ops) >= batch_size:
+            await coll.bulk_write(ops, ordered=False)
+            signed += len(ops)
+            ops = []
+    if ops:
+        await coll.bulk_write(ops, ordered=False)
+        signed += len(ops)
+    print(f"Signed {signed} opportunities ({time.perf_counter() - started:.1f}s)")
+
+    # Pass 2: cluster page by page, the way sync does.
+    linked = 0
+    batch = []
+    async for doc in coll.find({"minhash": {"$exists": True}}, {"_id": 0, "noticeId": 1, "minhash": 1, "lshBands": 1}).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            linked += await assign_clusters(batch)
+            batch = []
+    if batch:
+        linked += await assign_clusters(batch)
+    if signed or linked:
+        await opportunity_cache.bump_version()  # running API workers drop cached pages / ETags
+    clusters = len(await coll.distinct("duplicateClusterId", {"duplicateClusterId": {"$ne": None}}))
+    print(f"Linked {linked} notices into {clusters} clusters ({time.perf_counter() - started:.1f}s total)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
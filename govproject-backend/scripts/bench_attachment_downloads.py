@@ -0,0 +1,134 @@
+"""
+Benchmark: wall-clock time of download_attachments for one notice.
+
+Serves N synthetic attachments from a local HTTP server, each with its own delay
+(the last one the slowest), and downloads them into a scratch notice folder. With
+concurrent downloads the total should sit close to the slowest file, not the sum.
+One extra link never answers, to show a per-file timeout failing alone. Downloads
+stream to disk, so peak RSS growth should stay near ATTACHMENT_CONCURRENCY x
+DOWNLOAD_CHUNK whatever the file size.
+
+Then runs the same notice twice more through the attachment cache: once inside the
+freshness window (no requests at all) and once with the window at zero (conditional
+GETs answered 304 by the server's ETag). Needs MongoDB for the cache manifest; the
+bench's manifest entries and blobs are removed afterwards.
+
+Usage:
+    python scripts/bench_attachment_downloads.py [attachments] [size_kb]
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from services import attachments
+from services.attachments import ATTACHMENTS_DIR, download_attachments
+
+NOTICE_ID = "bench-attachments"
+HANG_SECONDS = 30
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _handler(size: int):
+    body = os.urandom(size)
+    etag = '"bench-v1"'
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.rsplit("/", 1)[-1]
+            delay = HANG_SECONDS if name == "hang" else float(name.split("-")[1])
+            time.sleep(delay)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Content-Disposition", f'attachment; filename="{name}.pdf"')
+            self.end_headers()
+            view = memoryview(body)
+            for i in range(0, len(body), 1 << 20):
+                self.wfile.write(view[i:i + (1 << 20)])
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    size = int(sys.argv[2]) * 1024 if len(sys.argv) > 2 else 512 * 1024
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(size))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}/files"
+
+    delays = [0.2 + 0.1 * i for i in range(n)]
+    links = [f"{base}/file-{d:.1f}-{i}" for i, d in enumerate(delays)] + [f"{base}/hang"]
+    attachments.ATTACHMENT_TIMEOUT = 3.0
+    shutil.rmtree(os.path.join(ATTACHMENTS_DIR, NOTICE_ID), ignore_errors=True)
+
+    rss_before = _rss_mb()
+    peak = rss_before
+
+    async def sample():
+        nonlocal peak
+        while True:
+            peak = max(peak, _rss_mb())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample())
+    t0 = time.perf_counter()
+    results = await download_attachments(NOTICE_ID, links)
+    elapsed = time.perf_counter() - t0
+    sampler.cancel()
+
+    t0 = time.perf_counter()
+    fresh = await download_attachments(NOTICE_ID, links[:-1])
+    fresh_s = time.perf_counter() - t0
+    attachments.ATTACHMENT_FRESH = timedelta(0)
+    t0 = time.perf_counter()
+    revalidated = await download_attachments(NOTICE_ID, links[:-1])
+    revalidated_s = time.perf_counter() - t0
+
+    await attachments.close_http_client()
+    server.shutdown()
+    shas = {r["sha256"] for r in results if r["success"]}
+    await attachments.get_manifest_collection().delete_many({"_id": {"$in": links}})
+    await attachments.get_blobs_collection().delete_many({"_id": {"$in": list(shas)}})
+    for sha in shas:
+        os.unlink(attachments.blob_path(sha))
+    shutil.rmtree(os.path.join(ATTACHMENTS_DIR, NOTICE_ID), ignore_errors=True)
+
+    ok = sum(r["success"] for r in results)
+    print(f"{ok}/{len(links)} downloaded in {elapsed:.2f}s; slowest file {max(delays):.1f}s, "
+          f"sequential would take {sum(delays):.1f}s + timeout")
+    print(f"{size / 2**20:.1f} MB per file; peak RSS growth {peak - rss_before:.1f} MB")
+    for r in results:
+        if not r["success"]:
+            print("  failed:", r["url"].rsplit("/", 1)[-1], "-", r["error"])
+    print(f"Stored once: {len(shas)} blob(s) for {ok} files (identical bodies share one)")
+    print(f"Fresh cache: {[r.get('cache') for r in fresh].count('fresh')}/{n} in {fresh_s * 1000:.0f} ms")
+    print(f"Revalidated: {[r.get('cache') for r in revalidated].count('revalidated')}/{n} in {revalidated_s:.2f}s "
+          f"(304s; latency is the server's per-file delay)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
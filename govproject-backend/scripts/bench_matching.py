@@ -0,0 +1,73 @@
+"""
+Benchmark: vectorized match scoring.
+
+Builds an OpportunityMatrix from synthetic opportunities in memory (no Mongo) and
+times scoring a profile against all of them. The per-request cost is score();
+the build happens once per collection version.
+
+Usage:
+    python scripts/bench_matching.py [opportunities] [rounds]
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.matching import OpportunityMatrix
+
+NAICS = ["541511", "541512", "541519", "541330", "561210", "236220", "238210", "334111", "517311", "611430"]
+SET_ASIDES = [None, None, None, "SBA", "SBP", "8A", "HZC", "SDVOSBC", "WOSB", "EDWOSB", "VSA"]
+WORDS = "cloud migration cybersecurity network software maintenance janitorial construction training " \
+        "hvac data analytics engineering logistics medical equipment laboratory satellite radio".split()
+
+
+def _synthetic(n: int) -> list[dict]:
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "noticeId": f"bench-{i:06d}",
+            "title": " ".join(rng.sample(WORDS, 5)),
+            "naicsCodes": rng.sample(NAICS, rng.randint(1, 3)),
+            "typeOfSetAside": rng.choice(SET_ASIDES),
+            "responseDeadlineAt": now + timedelta(days=rng.randint(-10, 90)) if rng.random() > 0.1 else None,
+        }
+        for i in range(n)
+    ]
+
+
+PROFILE = {
+    "naicsCodes": ["541511", "541512"],
+    "capabilities": ["Cloud migration", "Cybersecurity operations", "Data analytics"],
+    "certifications": ["SDVOSB"],
+    "setAsideType": "Small Business",
+    "pastPerformance": [{"keywords": ["network", "software"]}],
+}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    docs = _synthetic(n)
+
+    t0 = time.perf_counter()
+    matrix = OpportunityMatrix(docs)
+    build = time.perf_counter() - t0
+
+    timings = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        top = matrix.score(PROFILE, limit=20)
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    print(f"{n} opportunities: build {build * 1000:.0f} ms (once per version)")
+    print(f"score: p50 {timings[len(timings) // 2] * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms over {rounds} rounds")
+    print(f"top match: {top[0]['noticeId']} score {top[0]['score']} {top[0]['signals']}")
+
+
+if __name__ == "__main__":
+    main()
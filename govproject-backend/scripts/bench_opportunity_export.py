@@ -0,0 +1,88 @@
+"""
+Benchmark: memory of the streaming opportunity export.
+
+Seeds a scratch collection (bench_export_opportunities) with synthetic
+opportunities, streams it through the same iter_export the endpoint uses, and
+samples process RSS as rows go by. RSS should stay flat after the first batch;
+the script exits non-zero if it grows by more than MAX_GROWTH_MB.
+
+Usage:
+    python scripts/bench_opportunity_export.py [documents] [ndjson|csv] [batch_size]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from db import db
+from services.opportunity_export import iter_export
+from services.opportunity_query import listing_projection
+
+BENCH_COLLECTION = "bench_export_opportunities"
+MAX_GROWTH_MB = 32
+SAMPLES = 10
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+async def _seed(coll, n: int):
+    await coll.drop()
+    await coll.create_index([("postedDate", -1), ("noticeId", -1)])
+    batch = []
+    for i in range(n):
+        batch.append({
+            "noticeId": f"export-{i:07d}",
+            "title": f"Synthetic opportunity {i} for export benchmarking",
+            "postedDate": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "fullParentPathName": "DEPT OF DEFENSE.DEPT OF THE ARMY",
+            "naicsCodes": ["541511", "561210"],
+            "active": "Yes",
+            "pointOfContact": [{"fullName": "Jane Doe", "email": "jane@example.gov"}],
+            "resourceLinks": [f"https://sam.gov/files/{i}/download"],
+        })
+        if len(batch) == 10000:
+            await coll.insert_many(batch)
+            batch = []
+    if batch:
+        await coll.insert_many(batch)
+
+
+async def main() -> int:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    fmt = sys.argv[2] if len(sys.argv) > 2 else "ndjson"
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    coll = db[BENCH_COLLECTION]
+    print(f"Seeding {n} documents...")
+    await _seed(coll, n)
+
+    every = max(1, n // SAMPLES)
+    rows = 0
+    size = 0
+    rss = []
+    t0 = time.perf_counter()
+    async for chunk in iter_export(coll, {}, listing_projection("full"), fmt=fmt, batch_size=batch_size):
+        size += len(chunk)
+        rows += chunk.count(b"\n")
+        if rows // every > len(rss) - 1:
+            rss.append(_rss_mb())
+            print(f"  {rows:>8} rows  {size / 2**20:8.1f} MB streamed  RSS {rss[-1]:7.1f} MB")
+    elapsed = time.perf_counter() - t0
+    await coll.drop()
+
+    growth = max(rss) - rss[0]
+    print(f"{fmt}: {size / 2**20:.1f} MB in {elapsed:.1f}s; RSS growth after first batch {growth:.1f} MB")
+    return 1 if growth > MAX_GROWTH_MB else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
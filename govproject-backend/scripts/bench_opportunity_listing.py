@@ -0,0 +1,50 @@
+"""
+Benchmark: GET /opportunities payload size and latency by view and page size.
+
+Hits a running API (API_URL, default http://127.0.0.1:8000) and reports
+payload bytes, p50 and p95 latency for view=full and view=summary at
+limit=50 and limit=1000. Each request carries a distinct "_" param, so none is
+served from the API's page LRU: the numbers measure query, projection and
+serialization.
+
+Usage:
+    python scripts/bench_opportunity_listing.py [requests_per_case]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
+CASES = [(view, limit) for limit in (50, 1000) for view in ("full", "summary")]
+
+
+def _p95(samples: list[float]) -> float:
+    return statistics.quantiles(samples, n=20)[-1] if len(samples) >= 2 else samples[0]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{API_URL}/opportunities, {n} requests per case")
+    print(f"{'view':<9}{'limit':>6}{'bytes':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    with httpx.Client(base_url=API_URL, timeout=60) as client:
+        for view, limit in CASES:
+            params = {"limit": limit, "view": view, "includeTotal": "false"}
+            client.get("/opportunities", params=params).raise_for_status()  # warm-up
+            samples = []
+            size = 0
+            for i in range(n):
+                t0 = time.perf_counter()
+                # Unknown params are ignored by the endpoint but are part of the page-cache key.
+                res = client.get("/opportunities", params={**params, "_": f"{time.time_ns()}-{i}"})
+                samples.append((time.perf_counter() - t0) * 1000)
+                res.raise_for_status()
+                size = len(res.content)
+            print(f"{view:<9}{limit:>6}{size:>12,}{statistics.median(samples):>10.1f}{_p95(samples):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
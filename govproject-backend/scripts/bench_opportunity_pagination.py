@@ -0,0 +1,92 @@
+"""
+Benchmark: GET /opportunities page latency, skip/offset vs keyset cursor.
+
+Seeds a scratch collection (bench_opportunities) with synthetic active
+opportunities and the same listing indexes, then times page 1 and page N with
+both strategies using the query helpers the endpoint uses. Cursor latency
+should be flat; skip latency grows with the page number.
+
+Usage:
+    python scripts/bench_opportunity_pagination.py [pages] [limit]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from db import db
+from services.opportunity_query import LISTING_SORT, after_cursor, encode_cursor
+
+BENCH_COLLECTION = "bench_opportunities"
+QUERY = {"active": "Yes"}
+REPEATS = 15
+
+
+async def _seed(coll, n: int):
+    await coll.drop()
+    await coll.create_index([("active", 1), ("postedAt", -1), ("noticeId", -1)])
+    start = date(2024, 1, 1)
+    batch = []
+    for i in range(n):
+        posted = start + timedelta(days=i % 365)
+        batch.append({
+            "noticeId": f"bench-{i}",
+            "title": f"Bench opportunity {i}",
+            "postedDate": posted.isoformat(),
+            "postedAt": datetime(posted.year, posted.month, posted.day, tzinfo=timezone.utc),
+            "active": "Yes",
+        })
+        if len(batch) == 5000:
+            await coll.insert_many(batch)
+            batch = []
+    if batch:
+        await coll.insert_many(batch)
+
+
+async def _time(fn) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+async def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    coll = db[BENCH_COLLECTION]
+    print(f"Seeding {pages * limit} documents...")
+    await _seed(coll, pages * limit)
+
+    # Walk the cursor chain once to get the cursor that opens the last page.
+    cursor = None
+    for _ in range(pages - 1):
+        items = await coll.find(after_cursor(QUERY, cursor)).sort(LISTING_SORT).limit(limit).to_list(length=limit)
+        cursor = encode_cursor(items[-1])
+    last_cursor = cursor
+
+    def skip_page(page: int):
+        return lambda: coll.find(QUERY).sort(LISTING_SORT).skip((page - 1) * limit).limit(limit).to_list(length=limit)
+
+    def cursor_page(c):
+        return lambda: coll.find(after_cursor(QUERY, c)).sort(LISTING_SORT).limit(limit).to_list(length=limit)
+
+    print(f"limit={limit}, median of {REPEATS} runs (ms)")
+    print(f"{'':10}{'page 1':>10}{f'page {pages}':>12}")
+    print(f"{'offset':10}{await _time(skip_page(1)):10.2f}{await _time(skip_page(pages)):12.2f}")
+    print(f"{'cursor':10}{await _time(cursor_page(None)):10.2f}{await _time(cursor_page(last_cursor)):12.2f}")
+
+    await coll.drop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
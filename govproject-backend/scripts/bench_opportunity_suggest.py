@@ -0,0 +1,79 @@
+"""
+Benchmark: typeahead latency of the in-process suggest index.
+
+Builds a SuggestIndex from synthetic active opportunities in memory (no Mongo) and
+times suggest() for a mix of solicitation-number, agency and title prefixes.
+Target: p99 under 5 ms at 50k opportunities.
+
+Usage:
+    python scripts/bench_opportunity_suggest.py [opportunities] [rounds]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.opportunity_suggest import SuggestIndex
+
+AGENCIES = [
+    "DEPT OF DEFENSE.DEPT OF THE ARMY.W6QK ACC-APG",
+    "DEPT OF DEFENSE.DEPT OF THE NAVY.NAVSUP FLT LOG CTR NORFOLK",
+    "DEPT OF DEFENSE.DEPT OF THE AIR FORCE.FA8773 HQ CPSG",
+    "VETERANS AFFAIRS, DEPARTMENT OF.VETERANS AFFAIRS, DEPARTMENT OF.NETWORK CONTRACT OFFICE 10",
+    "HEALTH AND HUMAN SERVICES, DEPARTMENT OF.NATIONAL INSTITUTES OF HEALTH.NIH NCI",
+    "HOMELAND SECURITY, DEPARTMENT OF.US COAST GUARD.SFLC PROCUREMENT BRANCH 1",
+    "GENERAL SERVICES ADMINISTRATION.FEDERAL ACQUISITION SERVICE.GSA/FAS ADMIN SVCS",
+]
+WORDS = "cloud migration cybersecurity network software maintenance janitorial construction training " \
+        "hvac data analytics engineering logistics medical equipment laboratory satellite radio roofing " \
+        "paving dredging fuel vehicles furniture printing translation security guard".split()
+QUERIES = ["w91", "w912dr", "n00", "fa8", "36c", "dept", "army", "veterans", "health", "coast",
+           "cl", "cloud", "cyber", "hvac ro", "data ana", "medical equ", "roof", "guard se"]
+
+
+def _synthetic(n: int) -> list[dict]:
+    rng = random.Random(7)
+    prefixes = ["W912DR", "W91QV1", "N00189", "FA8773", "36C10X", "75N910", "70Z0G1", "47QTCA"]
+    return [
+        {
+            "noticeId": f"bench-{i:06d}",
+            "title": " ".join(rng.sample(WORDS, 6)).title(),
+            "solicitationNumber": f"{rng.choice(prefixes)}{rng.randint(20, 26)}{'QRB'[i % 3]}{i:04d}",
+            "fullParentPathName": rng.choice(AGENCIES),
+            "active": "Yes",
+            "ingestedAt": "2026-01-01T00:00:00Z",
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    index = SuggestIndex()
+    t0 = time.perf_counter()
+    for doc in _synthetic(n):
+        index.apply(doc)
+    print(f"{n} opportunities indexed in {(time.perf_counter() - t0) * 1000:.0f} ms "
+          f"({len(index.titles.terms)} title terms, {len(index.solicitations.terms)} solicitations)")
+
+    timings = []
+    for _ in range(rounds):
+        for q in QUERIES:
+            t0 = time.perf_counter()
+            index.suggest(q)
+            timings.append(time.perf_counter() - t0)
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[int(len(timings) * 0.99)] * 1000
+    print(f"suggest: p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {timings[-1] * 1000:.2f} ms over {len(timings)} queries")
+    sample = index.suggest("hvac ro")
+    print("hvac ro ->", [t["title"] for t in sample["titles"][:3]])
+    print("army ->", index.suggest("army")["agencies"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark: per-record opportunity validation cost on the sync path.
+
+Compares the old per-record model_validate + model_dump against validate_page
+(one TypeAdapter pass per page) and validate_page(trusted=True). No Mongo or
+SAM.gov access needed; records are synthetic SAM.gov search results.
+
+Usage:
+    python scripts/bench_opportunity_validation.py [records] [rounds]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.opportunity import GovPreneursOpportunity, from_sam, validate_page
+
+
+def _sam_record(i: int) -> dict:
+    return {
+        "noticeId": f"{i:032x}",
+        "title": f"Facility maintenance services lot {i}",
+        "postedDate": "2025-01-15",
+        "solicitationNumber": f"W912-{i:06d}",
+        "fullParentPathName": "DEPT OF DEFENSE.DEPT OF THE ARMY.AMC",
+        "type": "Solicitation",
+        "archiveDate": "2025-03-01",
+        "typeOfSetAside": "SBA",
+        "typeOfSetAsideDescription": "Total Small Business Set-Aside (FAR 19.5)",
+        "responseDeadLine": "2025-02-14T14:00:00-05:00",
+        "naicsCode": "561210",
+        "naicsCodes": ["561210"],
+        "active": "Yes",
+        "description": f"https://api.sam.gov/prod/opportunities/v1/noticedesc?noticeid={i:032x}",
+        "resourceLinks": [f"https://sam.gov/api/prod/opps/v3/opportunities/resources/files/{i}/download"],
+        "uiLink": f"https://sam.gov/opp/{i:032x}/view",
+        "pointOfContact": [{"fullName": "Jane Doe", "email": "jane@example.gov", "phone": "555-0100", "type": "primary"}],
+        "placeOfPerformance": {
+            "city": {"code": "12345", "name": "Fort Belvoir"},
+            "state": {"code": "VA", "name": "Virginia"},
+            "country": {"code": "USA", "name": "UNITED STATES"},
+        },
+    }
+
+
+def _per_record(records: list[dict]) -> list[dict]:
+    return [GovPreneursOpportunity.model_validate(r).model_dump(exclude_none=True) for r in records]
+
+
+def _bench(label: str, fn, records: list[dict], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn(records)
+        best = min(best, time.perf_counter() - t0)
+    per_record_us = best / len(records) * 1e6
+    print(f"{label:<28} {best * 1000:8.1f} ms/page  {per_record_us:6.2f} µs/record")
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    page = [from_sam(_sam_record(i)) for i in range(n)]
+
+    # All three paths must agree on the stored document.
+    assert _per_record(page) == validate_page(page)[0] == validate_page(page, trusted=True)[0]
+
+    print(f"{n} records/page, best of {rounds} rounds")
+    base = _bench("per-record model_validate", _per_record, page, rounds)
+    adapter = _bench("validate_page (TypeAdapter)", lambda r: validate_page(r), page, rounds)
+    trusted = _bench("validate_page(trusted=True)", lambda r: validate_page(r, trusted=True), page, rounds)
+    print(f"speedup: TypeAdapter {base / adapter:.2f}x, trusted {base / trusted:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
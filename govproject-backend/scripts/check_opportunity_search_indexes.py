@@ -0,0 +1,76 @@
+"""
+Check that every GET /opportunities/search filter combination is index-backed.
+
+Runs explain() on the $match built by build_search_match for each subset of
+filters (with and without activeOnly) and fails if any winning plan contains a
+COLLSCAN. Read-only apart from ensure_indexes().
+
+Usage:
+    python scripts/check_opportunity_search_indexes.py
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from models.opportunity import ensure_indexes, get_opportunities_collection
+from services.opportunity_query import build_search_match
+
+SAMPLE_FILTERS = {
+    "naics": ["541511", "561210"],
+    "set_aside": ["SBA"],
+    "agency": "DEPT OF DEFENSE",
+    "deadline_from": date(2025, 1, 1),
+    "deadline_to": date(2025, 12, 31),
+    "q": "maintenance",
+}
+
+
+def _stages(plan) -> set[str]:
+    """All stage names in an explain plan tree (classic and SBE layouts)."""
+    found = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            found.add(plan["stage"])
+        for v in plan.values():
+            found |= _stages(v)
+    elif isinstance(plan, list):
+        for v in plan:
+            found |= _stages(v)
+    return found
+
+
+async def main() -> int:
+    await ensure_indexes()
+    coll = get_opportunities_collection()
+    names = list(SAMPLE_FILTERS)
+    failures = 0
+    checked = 0
+    for r in range(len(names) + 1):
+        for combo in itertools.combinations(names, r):
+            for active_only in (True, False):
+                if not combo and not active_only:
+                    continue  # no filter at all is a full listing, not a search
+                match = build_search_match(active_only=active_only, **{k: SAMPLE_FILTERS[k] for k in combo})
+                explain = await coll.find(match).explain()
+                stages = _stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+                checked += 1
+                label = ", ".join(combo + (("activeOnly",) if active_only else ()))
+                if "COLLSCAN" in stages:
+                    failures += 1
+                    print(f"COLLSCAN  {label}")
+                else:
+                    print(f"ok        {label}  ({', '.join(sorted(stages))})")
+    print(f"{checked - failures}/{checked} filter combinations use an index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
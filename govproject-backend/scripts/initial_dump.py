@@ -3,6 +3,7 @@
 import asyncio
 import os
 import sys
+import time
 from datetime import datetime, timedelta, timezone
 
 # Project root so "models" is found when run as python scripts/initial_dump.py
@@ -12,23 +13,11 @@ import requests
 from dotenv import load_dotenv
 
 load_dotenv()
-from models.opportunity import ensure_indexes, upsert_opportunity
+from models.opportunity import bulk_upsert_opportunities, ensure_indexes, from_sam
+from services import opportunity_cache, opportunity_dedup
+from services.opportunity_stats import rebuild as rebuild_stats
 
 BASE = "https://api.sam.gov/opportunities/v2/search"
-KEYS = ("noticeId", "title", "postedDate", "solicitationNumber", "fullParentPathName", "type",
-        "archiveDate", "typeOfSetAside", "typeOfSetAsideDescription", "responseDeadLine",
-        "naicsCode", "naicsCodes", "active", "description", "resourceLinks", "uiLink")
-
-
-def to_opp(sam):
-    o = {k: sam.get(k) for k in KEYS}
-    o["naicsCodes"] = o.get("naicsCodes") or []
-    if sam.get("pointOfContact"):
-        o["pointOfContact"] = [{"fullName": p.get("fullName"), "email": p.get("email"), "phone": p.get("phone")} for p in sam["pointOfContact"]]
-    if sam.get("placeOfPerformance"):
-        p = sam["placeOfPerformance"]
-        o["placeOfPerformance"] = {"city": {"name": (p.get("city") or {}).get("name")}, "state": p.get("state"), "country": p.get("country")}
-    return o
 
 
 async def main():
@@ -42,6 +31,7 @@ async def main():
 
     await ensure_indexes()
     total = 0
+    started = time.perf_counter()
     for i in range(2):
         try:
             r = requests.get(BASE, params={"api_key": api_key, "postedFrom": posted_from, "postedTo": posted_to, "limit": 1000, "offset": i * 1000}, timeout=60)
@@ -52,14 +42,22 @@ async def main():
             break
         if not batch:
             break
-        for sam in batch:
-            try:
-                await upsert_opportunity(to_opp(sam))
-                total += 1
-            except Exception as e:
-                print("Skip", sam.get("noticeId"), e)
-        print(f"Page {i + 1}: {len(batch)} stored, total {total}")
-    print("Done.", total, "opportunities.")
+        # Signed here as in sync: minhash is not part of contentHash, so a later sync
+        # would see these notices as unchanged and never sign them.
+        records = [opportunity_dedup.with_signature(from_sam(sam)) for sam in batch]
+        result = await bulk_upsert_opportunities(records, trusted=True)
+        if result["changed"]:
+            current = {o["noticeId"]: o for o in records}
+            await opportunity_dedup.assign_clusters([current[i] for i in result["changed"]])
+            await opportunity_cache.bump_version()  # running API workers drop cached pages / ETags
+        for f in result["failed"]:
+            print("Skip", f["noticeId"], f["error"])
+        stored = result["inserted"] + result["updated"] + result["unchanged"]
+        total += stored
+        print(f"Page {i + 1}: {stored} stored ({result['inserted']} new, {result['updated']} updated, {result['unchanged']} unchanged), total {total}")
+    elapsed = time.perf_counter() - started
+    print("Done.", total, "opportunities.", f"{total / elapsed:.1f} records/sec" if elapsed > 0 else "")
+    print("Rebuilt", await rebuild_stats(), "rollup buckets.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,74 @@
+"""
+One-time migration: add postedAt / responseDeadlineAt / archiveAt (BSON dates)
+to opportunities stored before sync started writing them, and drop the
+(postedDate, noticeId) listing indexes replaced by (postedAt, noticeId) ones.
+
+contentHash is recomputed over the migrated document so the next sync does not
+see every notice as changed. Safe to re-run; only documents missing a parsed
+field are touched.
+
+Usage:
+    python scripts/migrate_opportunity_dates.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+load_dotenv()
+from models.opportunity import (
+    DATE_FIELDS,
+    content_hash,
+    ensure_indexes,
+    get_opportunities_collection,
+    with_parsed_dates,
+)
+from services import opportunity_cache
+
+BATCH = 1000
+LEGACY_INDEXES = ("active_1_postedDate_-1_noticeId_-1", "postedDate_-1_noticeId_-1")
+
+
+async def main():
+    await ensure_indexes()
+    coll = get_opportunities_collection()
+    query = {"$or": [{parsed: {"$exists": False}} for parsed in DATE_FIELDS.values()]}
+    total = await coll.count_documents(query)
+    print(f"{total} opportunities to migrate")
+
+    done = 0
+    ops = []
+    async for doc in coll.find(query).batch_size(BATCH):
+        with_parsed_dates(doc)
+        # Unparseable raw dates are stored as null so the document counts as migrated.
+        update = {parsed: doc[parsed] for parsed in DATE_FIELDS.values()}
+        if "contentHash" in doc:
+            # Same input sync hashes: the exclude_none document.
+            update["contentHash"] = content_hash({k: v for k, v in doc.items() if v is not None})
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if len(ops) == BATCH:
+            await coll.bulk_write(ops, ordered=False)
+            done += len(ops)
+            ops = []
+            print(f"  {done}/{total}")
+    if ops:
+        await coll.bulk_write(ops, ordered=False)
+        done += len(ops)
+    print(f"Done. {done} opportunities migrated.")
+    if done:
+        await opportunity_cache.bump_version()  # running API workers drop cached pages / ETags
+    # Listing sort and keyset indexes moved from the raw postedDate string to postedAt.
+    existing = await coll.index_information()
+    for name in LEGACY_INDEXES:
+        if name in existing:
+            await coll.drop_index(name)
+            print(f"Dropped legacy index {name}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+"""
+Fetch and store notice description text (scopeOfWorkText) for active opportunities
+that don't have it yet, within today's DESCRIPTION_DAILY_QUOTA. Sync jobs run this
+automatically; use it to backfill notices synced before descriptions were stored.
+
+Usage:
+    python scripts/prefetch_descriptions.py [limit]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from models.opportunity import get_opportunities_collection
+from services.opportunity_descriptions import DESCRIPTION_DAILY_QUOTA, PENDING_QUERY, prefetch
+
+
+async def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    pending = await get_opportunities_collection().count_documents(PENDING_QUERY)
+    print(f"{pending} active notices without description text")
+    started = time.perf_counter()
+    result = await prefetch(limit)
+    print(f"Fetched {result['fetched']}, empty {result['empty']}, failed {result['failed']} "
+          f"in {time.perf_counter() - started:.1f}s; {result['quotaUsed']}/{DESCRIPTION_DAILY_QUOTA} requests used today")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,30 @@
+"""
+Recompute the opportunity_stats rollups from the opportunities collection.
+Sync keeps them current with deltas; run this after a bulk import outside sync
+(e.g. initial_dump.py), a migration, or if the counts ever look off.
+
+Usage:
+    python scripts/rebuild_opportunity_stats.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from services.opportunity_stats import rebuild
+
+
+async def main():
+    started = time.perf_counter()
+    buckets = await rebuild()
+    print(f"Rebuilt {buckets} rollup buckets in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+"""
+Rebuild every company's recommendation feed from the full match matrix.
+Sync keeps feeds current incrementally; run this after changing the scoring weights
+or FEED_SIZE, or to backfill feeds for profiles created before feeds existed.
+
+Usage:
+    python scripts/rebuild_recommendations.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from models.user_profile import get_user_profiles_collection
+from services.recommendations import PROFILE_PROJECTION, ensure_indexes, rebuild_feed
+
+
+async def main():
+    await ensure_indexes()
+    started = time.perf_counter()
+    companies = 0
+    async for profile in get_user_profiles_collection().find({"companyId": {"$exists": True}}, PROFILE_PROJECTION):
+        await rebuild_feed(profile)
+        companies += 1
+    print(f"Rebuilt {companies} feeds in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
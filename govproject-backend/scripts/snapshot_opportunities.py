@@ -0,0 +1,35 @@
+"""
+Append opportunities ingested since the last run to the Parquet snapshot
+(snapshots/opportunities/part-<timestamp>.parquet). Run after sync, e.g. nightly.
+
+Usage:
+    python scripts/snapshot_opportunities.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from models.opportunity import ensure_indexes
+from services.opportunity_snapshot import run_snapshot
+
+
+async def main():
+    await ensure_indexes()
+    started = time.perf_counter()
+    result = await run_snapshot()
+    elapsed = time.perf_counter() - started
+    if not result["rows"]:
+        print("Nothing new since", result["lastIngestedAt"])
+        return
+    print(f"Wrote {result['rows']} rows to {result['path']} in {elapsed:.1f}s (through {result['lastIngestedAt']})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
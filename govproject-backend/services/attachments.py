@@ -0,0 +1,369 @@
+"""
+Attachment downloads and the content-addressed attachment cache.
+
+Each file body is stored once, as downloads/.blobs/<sha[:2]>/<sha256>, and hardlinked
+into downloads/<noticeId>/ under its own filename, so a FAR clause PDF attached to a
+hundred notices takes disk space once. Two collections track the cache:
+
+  attachment_manifest – one document per URL: sha256, filename, size, ETag,
+                        Last-Modified, fetchedAt (body downloaded), checkedAt (last
+                        confirmed current with the server)
+  attachment_blobs    – one document per body: size, lastUsedAt, and the notice
+                        paths linked to it
+
+A URL checked within ATTACHMENT_FRESH_HOURS is served without touching the network;
+an older one is revalidated with If-None-Match / If-Modified-Since, and a 304 costs
+no body. When the blobs exceed ATTACHMENT_CACHE_MAX_GB, the least recently used are
+deleted together with their notice links and manifest entries (the next request for
+those URLs downloads them again).
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from urllib.parse import urlparse, unquote
+
+import httpx
+from pymongo import ASCENDING
+
+from db import db
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+ATTACHMENTS_DIR = "downloads"
+BLOB_DIR = os.path.join(ATTACHMENTS_DIR, ".blobs")  # same filesystem as the notice folders, for hardlinks
+ATTACHMENT_CONCURRENCY = int(os.getenv("ATTACHMENT_CONCURRENCY", "8"))  # downloads in flight per worker
+ATTACHMENT_PER_HOST = int(os.getenv("ATTACHMENT_PER_HOST", "4"))  # of those, to any one host
+ATTACHMENT_TIMEOUT = float(os.getenv("ATTACHMENT_TIMEOUT", "120"))  # seconds per file
+ATTACHMENT_MAX_BYTES = int(float(os.getenv("ATTACHMENT_MAX_MB", "250")) * 2**20)
+ATTACHMENT_FRESH = timedelta(hours=float(os.getenv("ATTACHMENT_FRESH_HOURS", "24")))
+ATTACHMENT_CACHE_MAX_BYTES = int(float(os.getenv("ATTACHMENT_CACHE_MAX_GB", "20")) * 2**30)
+EVICT_TO = 0.9  # evict down to this share of the limit, so one new file doesn't trigger another pass
+DOWNLOAD_CHUNK = 1 << 20  # bytes held in memory per download
+
+MANIFEST_COLLECTION = "attachment_manifest"
+BLOBS_COLLECTION = "attachment_blobs"
+
+CONTENT_TYPE_TO_EXT = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": ".xlsx",
+    "application/vnd.ms-excel": ".xls",
+    "application/msword": ".doc",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "application/zip": ".zip",
+    "text/plain": ".txt",
+    "text/html": ".html",
+}
+
+
+def get_manifest_collection():
+    return db[MANIFEST_COLLECTION]
+
+
+def get_blobs_collection():
+    return db[BLOBS_COLLECTION]
+
+
+_indexes_ready = False
+
+
+async def ensure_indexes():
+    global _indexes_ready
+    await get_manifest_collection().create_index("sha256")
+    await get_blobs_collection().create_index([("lastUsedAt", ASCENDING)])
+    _indexes_ready = True
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+# --- Filenames ---
+
+
+def _safe_basename(name: str) -> str:
+    """Sanitize a string for use as a filename."""
+    s = re.sub(r"[^\w\-_. ]", "_", unquote(name).strip())
+    return s[:200] if s else ""
+
+
+def _filename_from_response(response, url: str, index: int) -> str:
+    """Choose filename from Content-Disposition, URL path, or fallback to attachment_{index}.ext."""
+    content_disp = (response.headers.get("content-disposition") or "").lower()
+    if "filename=" in content_disp:
+        part = content_disp.split("filename=", 1)[-1].strip().strip('"\'')
+        if ";" in part:
+            part = part.split(";")[0].strip()
+        name = _safe_basename(part)
+        if name and name.lower() != "download":
+            return name
+    name = _safe_basename(os.path.basename(urlparse(url).path))
+    if name and name.lower() != "download":
+        return name
+    content_type = (response.headers.get("content-type") or "").split(";")[0].strip().lower()
+    ext = CONTENT_TYPE_TO_EXT.get(content_type, "")
+    return f"attachment_{index}{ext}"
+
+
+_FALLBACK_NAME = re.compile(r"attachment_\d+(\.\w+)?")
+
+
+def _claim_name(filename: str, sha256: str, index: int, taken: dict[str, str]) -> str:
+    """
+    Name for this file in one notice's folder. The manifest keeps the name from whichever
+    notice fetched the URL first, so a fallback attachment_<i> is renumbered with this
+    notice's index, and a name already used here by other content gets a sha prefix.
+    """
+    if _FALLBACK_NAME.fullmatch(filename):
+        filename = f"attachment_{index}{os.path.splitext(filename)[1]}"
+    if taken.setdefault(filename, sha256) != sha256:
+        stem, ext = os.path.splitext(filename)
+        filename = f"{stem}_{sha256[:12]}{ext}"
+        taken[filename] = sha256
+    return filename
+
+
+# --- HTTP ---
+
+# One pooled client per worker, shared by every request's downloads (keep-alive, TLS reuse).
+_http: Optional[httpx.AsyncClient] = None
+_download_slots = asyncio.Semaphore(ATTACHMENT_CONCURRENCY)
+_host_slots: dict[str, asyncio.Semaphore] = {}
+# Concurrent requests for one URL (two companies drafting the same notice) wait for a single fetch.
+_url_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+_evict_lock = asyncio.Lock()
+
+
+def _http_client() -> httpx.AsyncClient:
+    global _http
+    if _http is None or _http.is_closed:
+        limits = httpx.Limits(max_connections=ATTACHMENT_CONCURRENCY, max_keepalive_connections=ATTACHMENT_CONCURRENCY)
+        _http = httpx.AsyncClient(timeout=30.0, follow_redirects=True, limits=limits)
+    return _http
+
+
+async def close_http_client() -> None:
+    """Close the shared download client (app shutdown)."""
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+# --- Blob store ---
+
+
+async def _stream_to_blob(response: httpx.Response, max_bytes: int) -> tuple[str, int, bool]:
+    """
+    Write the body in DOWNLOAD_CHUNK pieces to a temp file in the blob store, hashing as
+    it goes, then rename it to its content address (atomic: readers never see a partial
+    blob). If that body is already stored the temp file is dropped. Returns (sha256, size, new).
+    """
+    declared = int(response.headers.get("content-length") or 0)
+    if declared > max_bytes:
+        raise AttachmentTooLarge(f"{declared} bytes exceeds limit of {max_bytes}")
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, prefix=".", suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise AttachmentTooLarge(f"more than {max_bytes} bytes; download stopped")
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        sha256 = digest.hexdigest()
+        target = blob_path(sha256)
+        if os.path.exists(target):
+            os.unlink(tmp_path)
+            return sha256, size, False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return sha256, size, True
+
+
+def _link_into(sha256: str, dir_path: str, filename: str) -> str:
+    """Hardlink the blob into dir_path/filename (copy if the link fails); returns the path."""
+    source = blob_path(sha256)
+    target = os.path.normpath(os.path.join(dir_path, filename))
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return target
+    os.makedirs(dir_path, exist_ok=True)
+    tmp = f"{target}.link"
+    if os.path.exists(tmp):
+        os.unlink(tmp)
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, target)  # a stale file of the same name is swapped atomically
+    return target
+
+
+async def _touch_blob(sha256: str, size: int, linked_path: str, now: datetime) -> None:
+    await get_blobs_collection().update_one(
+        {"_id": sha256},
+        {
+            "$set": {"lastUsedAt": now},
+            "$setOnInsert": {"size": size, "createdAt": now},
+            "$addToSet": {"links": linked_path},
+        },
+        upsert=True,
+    )
+
+
+async def cache_size() -> int:
+    """Total bytes of stored blobs, per attachment_blobs."""
+    rows = await get_blobs_collection().aggregate([{"$group": {"_id": None, "bytes": {"$sum": "$size"}}}]).to_list(1)
+    return rows[0]["bytes"] if rows else 0
+
+
+def _remove_blob_files(sha256: str, links: list[str]) -> None:
+    source = blob_path(sha256)
+    try:
+        inode = os.stat(source).st_ino
+    except FileNotFoundError:
+        inode = None
+    for path in links:
+        try:
+            # Only links to this blob: a notice file since replaced by newer content stays.
+            if inode is not None and os.stat(path).st_ino == inode:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+    if inode is not None:
+        os.unlink(source)
+
+
+async def evict(max_bytes: Optional[int] = None) -> dict:
+    """
+    Delete least recently used blobs, with their notice links and manifest entries,
+    until the store is back under EVICT_TO of max_bytes. Returns {"evicted", "freedBytes", "bytes"}.
+    """
+    max_bytes = ATTACHMENT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    async with _evict_lock:
+        total = await cache_size()
+        evicted = freed = 0
+        if total > max_bytes:
+            goal = total - int(max_bytes * EVICT_TO)
+            blobs = get_blobs_collection()
+            async for blob in blobs.find({}, {"size": 1, "links": 1}).sort("lastUsedAt", ASCENDING):
+                if freed >= goal:
+                    break
+                await get_manifest_collection().delete_many({"sha256": blob["_id"]})
+                await asyncio.to_thread(_remove_blob_files, blob["_id"], blob.get("links") or [])
+                await blobs.delete_one({"_id": blob["_id"]})
+                evicted += 1
+                freed += blob.get("size") or 0
+            logger.info("[ATTACHMENTS] Evicted %d blobs (%.1f MB)", evicted, freed / 2**20)
+    return {"evicted": evicted, "freedBytes": freed, "bytes": total - freed}
+
+
+# --- Downloads ---
+
+
+async def _download_one(
+    url: str, dir_path: str, index: int, taken: dict[str, str], timeout: Optional[float] = None
+) -> dict:
+    """
+    Put one URL's file into dir_path from the cache, revalidating or downloading it as
+    needed. taken maps names already used in dir_path by this call to their sha256. Returns {url, localPath, success, cache?, sha256?, size?, error?}, where cache
+    is "fresh" (no request), "revalidated" (304) or "downloaded".
+    """
+    timeout = timeout or ATTACHMENT_TIMEOUT
+    item = {"url": url, "localPath": "", "success": False}
+    manifests = get_manifest_collection()
+    host = urlparse(url).hostname or ""
+    host_slots = _host_slots.setdefault(host, asyncio.Semaphore(ATTACHMENT_PER_HOST))
+    stored_new = False
+
+    async def fetch(entry: Optional[dict]) -> dict:
+        nonlocal stored_new
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("lastModified"):
+                headers["If-Modified-Since"] = entry["lastModified"]
+        async with _http_client().stream("GET", url, headers=headers) as response:
+            now = _now()
+            if entry and response.status_code == 304:
+                await manifests.update_one({"_id": url}, {"$set": {"checkedAt": now}})
+                return {**entry, "cache": "revalidated"}
+            response.raise_for_status()
+            filename = _filename_from_response(response, url, index)
+            sha256, size, stored_new = await _stream_to_blob(response, ATTACHMENT_MAX_BYTES)
+            entry = {
+                "sha256": sha256, "filename": filename, "size": size,
+                "etag": response.headers.get("etag"), "lastModified": response.headers.get("last-modified"),
+                "fetchedAt": now, "checkedAt": now,
+            }
+            await manifests.update_one({"_id": url}, {"$set": entry}, upsert=True)
+            return {**entry, "cache": "downloaded"}
+
+    lock = _url_locks.setdefault(url, asyncio.Lock())
+    try:
+        async with lock:
+            entry = await manifests.find_one({"_id": url})
+            if entry and not os.path.exists(blob_path(entry["sha256"])):
+                entry = None  # blob deleted behind the manifest's back: fetch unconditionally
+            checked = entry and entry["checkedAt"].replace(tzinfo=timezone.utc)
+            if entry and _now() - checked < ATTACHMENT_FRESH:
+                entry["cache"] = "fresh"
+            else:
+                async with _download_slots, host_slots:
+                    # The timeout covers this file only (not time queued for a slot); a slow file fails alone.
+                    entry = await asyncio.wait_for(fetch(entry), timeout)
+            filename = _claim_name(entry["filename"], entry["sha256"], index, taken)
+            local_path = await asyncio.to_thread(_link_into, entry["sha256"], dir_path, filename)
+            await _touch_blob(entry["sha256"], entry["size"], local_path, _now())
+        item.update(
+            localPath=local_path, success=True, cache=entry["cache"], sha256=entry["sha256"], size=entry["size"]
+        )
+    except asyncio.TimeoutError:
+        item["error"] = f"Timed out after {timeout:.0f}s"
+    except Exception as e:
+        item["error"] = str(e)
+    if stored_new:
+        try:
+            await evict()
+        except Exception:
+            logger.exception("[ATTACHMENTS] Cache eviction failed")
+    return item
+
+
+async def download_attachments(notice_id: str, resource_links: list[str]) -> list[dict]:
+    """
+    Place each resource link's file in downloads/<notice_id>/ concurrently, through the
+    cache; return list of {url, localPath, success, cache?, sha256?, size?, error?} in
+    link order. A failed, oversized or timed-out file is reported, not raised.
+    """
+    if not _indexes_ready:
+        await ensure_indexes()
+    base_dir = os.path.join(ATTACHMENTS_DIR, notice_id or "unknown")
+    links = [(i, url) for i, url in enumerate(resource_links) if url and isinstance(url, str)]
+    taken: dict[str, str] = {}
+    return list(await asyncio.gather(*(_download_one(url, base_dir, i, taken) for i, url in links)))
@@ -0,0 +1,218 @@
+"""
+Opportunity-to-company match scoring.
+Active opportunities are loaded once into flat NumPy arrays (OpportunityMatrix) and
+every profile is scored against all of them with vectorized ops — no per-document
+Python loop. The matrix is rebuilt when the opportunities version (bumped by sync)
+changes.
+
+Signals (each 0..1, weighted into one score):
+  naics     – any of the opportunity's NAICS codes is one of the company's
+  setAside  – 1 for a set-aside the company qualifies for, 0.5 for unrestricted;
+              restricted set-asides the company can't bid are excluded
+  deadline  – days of slack before responseDeadlineAt (full at 30+); past deadlines excluded
+  keywords  – overlap of title words with capabilities / past-performance keywords
+"""
+
+import asyncio
+import re
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from services import opportunity_cache
+
+WEIGHTS = {"naics": 0.40, "setAside": 0.25, "deadline": 0.10, "keywords": 0.25}
+FULL_SLACK_DAYS = 30.0
+KEYWORD_SATURATION = 3  # title words in common for a full keyword score
+UNKNOWN_DEADLINE_SCORE = 0.5
+UNRESTRICTED_SCORE = 0.5
+
+# Profile certification / setAsideType keyword (lowercase, alphanumeric only) -> SAM typeOfSetAside codes.
+SET_ASIDE_ELIGIBILITY = {
+    "smallbusiness": {"SBA", "SBP"},
+    "8a": {"8A", "8AN"},
+    "hubzone": {"HZC", "HZS"},
+    "sdvosb": {"SDVOSBC", "SDVOSBS", "VSA", "VSS"},
+    "servicedisabled": {"SDVOSBC", "SDVOSBS", "VSA", "VSS"},
+    "vosb": {"VSA", "VSS"},
+    "veteran": {"VSA", "VSS"},
+    "wosb": {"WOSB", "WOSBSS"},
+    "womanowned": {"WOSB", "WOSBSS"},
+    "edwosb": {"EDWOSB", "EDWOSBSS", "WOSB", "WOSBSS"},
+}
+SAM_SET_ASIDE_CODES = set().union(*SET_ASIDE_ELIGIBILITY.values()) | {"ISBEE", "IEE", "BICiv", "VSBCiv"}
+
+STOPWORDS = frozenset(
+    "and the for with from that this services service support contract contracts inc llc "
+    "notice solicitation request requirement requirements of to in on at by an or".split()
+)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall((text or "").lower()) if len(t) > 2 and t not in STOPWORDS]
+
+
+def eligible_set_asides(profile: dict) -> set[str]:
+    """SAM set-aside codes a company can bid on, from setAsideType and certifications."""
+    raw = [profile.get("setAsideType") or "", *(profile.get("certifications") or [])]
+    codes = set()
+    for value in raw:
+        if value.strip().upper() in SAM_SET_ASIDE_CODES:
+            codes.add(value.strip().upper())
+        norm = re.sub(r"[^a-z0-9]", "", value.lower())
+        for key, allowed in SET_ASIDE_ELIGIBILITY.items():
+            if key in norm:
+                codes |= allowed
+    if codes:
+        codes |= SET_ASIDE_ELIGIBILITY["smallbusiness"]  # every socio-economic program is a small business
+    return codes
+
+
+def profile_keywords(profile: dict) -> set[str]:
+    words = set()
+    for cap in profile.get("capabilities") or []:
+        words.update(tokenize(cap))
+    for item in profile.get("pastPerformance") or []:
+        for kw in item.get("keywords") or []:
+            words.update(tokenize(kw))
+    return words
+
+
+class _Vocab:
+    """String -> dense int id, so membership tests run on integer arrays."""
+
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+
+    def add(self, s: str) -> int:
+        return self.ids.setdefault(s, len(self.ids))
+
+    def lookup(self, values) -> np.ndarray:
+        return np.array([self.ids[v] for v in values if v in self.ids], dtype=np.int32)
+
+
+class OpportunityMatrix:
+    """Active opportunities as flat arrays; ragged fields (NAICS, title words) as (values, owner) pairs."""
+
+    def __init__(self, docs: list[dict]):
+        self.n = len(docs)
+        self.notice_ids = [d["noticeId"] for d in docs]
+        self.titles = [d.get("title") or "" for d in docs]
+        self.deadlines_raw = [d.get("responseDeadLine") for d in docs]
+        self.set_asides_raw = [d.get("typeOfSetAside") for d in docs]
+
+        self.naics_vocab, self.word_vocab, self.set_aside_vocab = _Vocab(), _Vocab(), _Vocab()
+        naics, naics_owner, words, words_owner = [], [], [], []
+        set_aside = np.full(self.n, -1, dtype=np.int32)
+        deadline = np.full(self.n, np.nan)
+        for i, d in enumerate(docs):
+            for code in d.get("naicsCodes") or ([d["naicsCode"]] if d.get("naicsCode") else []):
+                naics.append(self.naics_vocab.add(code))
+                naics_owner.append(i)
+            for w in set(tokenize(d.get("title"))):
+                words.append(self.word_vocab.add(w))
+                words_owner.append(i)
+            if d.get("typeOfSetAside"):
+                set_aside[i] = self.set_aside_vocab.add(d["typeOfSetAside"])
+            dl = d.get("responseDeadlineAt")
+            if dl is not None:
+                deadline[i] = (dl if dl.tzinfo else dl.replace(tzinfo=timezone.utc)).timestamp()
+
+        self.naics = np.array(naics, dtype=np.int32)
+        self.naics_owner = np.array(naics_owner, dtype=np.int32)
+        self.words = np.array(words, dtype=np.int32)
+        self.words_owner = np.array(words_owner, dtype=np.int32)
+        self.set_aside = set_aside
+        self.deadline = deadline
+
+    def _overlap(self, values: np.ndarray, owner: np.ndarray, wanted: np.ndarray) -> np.ndarray:
+        """Per-opportunity count of values in wanted."""
+        if not len(wanted) or not len(values):
+            return np.zeros(self.n)
+        return np.bincount(owner[np.isin(values, wanted)], minlength=self.n).astype(float)
+
+    def score(self, profile: dict, limit: int = 50, now: Optional[float] = None) -> list[dict]:
+        """Top `limit` opportunities for profile, best first, with per-signal scores."""
+        if not self.n:
+            return []
+        now = now if now is not None else time.time()
+
+        naics = np.minimum(self._overlap(self.naics, self.naics_owner, self.naics_vocab.lookup(profile.get("naicsCodes") or [])), 1.0)
+        keywords = np.minimum(
+            self._overlap(self.words, self.words_owner, self.word_vocab.lookup(profile_keywords(profile))) / KEYWORD_SATURATION,
+            1.0,
+        )
+
+        eligible = self.set_aside_vocab.lookup(eligible_set_asides(profile))
+        restricted = self.set_aside >= 0
+        qualifies = np.isin(self.set_aside, eligible)
+        set_aside = np.where(restricted, qualifies.astype(float), UNRESTRICTED_SCORE)
+
+        slack_days = (self.deadline - now) / 86400.0
+        known = ~np.isnan(slack_days)
+        deadline = np.where(known, np.clip(slack_days / FULL_SLACK_DAYS, 0.0, 1.0), UNKNOWN_DEADLINE_SCORE)
+
+        total = (
+            WEIGHTS["naics"] * naics
+            + WEIGHTS["setAside"] * set_aside
+            + WEIGHTS["deadline"] * deadline
+            + WEIGHTS["keywords"] * keywords
+        )
+        excluded = (restricted & ~qualifies) | (known & (slack_days < 0))
+        total[excluded] = -np.inf
+
+        k = min(limit, int((~excluded).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-total, k - 1)[:k]
+        top = top[np.argsort(-total[top], kind="stable")]
+        return [
+            {
+                "noticeId": self.notice_ids[i],
+                "title": self.titles[i],
+                "responseDeadLine": self.deadlines_raw[i],
+                "typeOfSetAside": self.set_asides_raw[i],
+                "score": round(float(total[i]), 4),
+                "signals": {
+                    "naics": float(naics[i]),
+                    "setAside": float(set_aside[i]),
+                    "deadline": round(float(deadline[i]), 4),
+                    "keywords": round(float(keywords[i]), 4),
+                },
+            }
+            for i in top
+        ]
+
+
+# --- Cached matrix over the active collection ---
+
+MATRIX_PROJECTION = {
+    "_id": 0, "noticeId": 1, "title": 1, "naicsCode": 1, "naicsCodes": 1,
+    "typeOfSetAside": 1, "responseDeadLine": 1, "responseDeadlineAt": 1,
+}
+
+_matrix: Optional[tuple[int, OpportunityMatrix]] = None
+_build_lock = asyncio.Lock()
+
+
+async def get_matrix() -> OpportunityMatrix:
+    """Matrix of active opportunities for the current collection version (built once per version)."""
+    global _matrix
+    version = await opportunity_cache.current_version()
+    if _matrix and _matrix[0] == version:
+        return _matrix[1]
+    async with _build_lock:
+        if _matrix and _matrix[0] == version:
+            return _matrix[1]
+        from models.opportunity import get_opportunities_collection
+        docs = await get_opportunities_collection().find({"active": "Yes"}, MATRIX_PROJECTION).to_list(length=None)
+        _matrix = (version, OpportunityMatrix(docs))
+        return _matrix[1]
+
+
+async def match_opportunities(profile: dict, limit: int = 50) -> list[dict]:
+    matrix = await get_matrix()
+    return matrix.score(profile, limit=limit, now=datetime.now(timezone.utc).timestamp())
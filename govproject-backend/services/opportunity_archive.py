@@ -0,0 +1,80 @@
+"""
+Hot/cold tiering for opportunities.
+Inactive notices and notices past their archiveDate are moved, in batches, from
+opportunities to opportunities_archive, so the live collection (and its indexes,
+counts and listing scans) only holds what can still be bid on. Reads by noticeId go
+through models.opportunity.find_opportunity, which falls back to the archive.
+
+Run under the sync lease (services.sync_jobs.run_archive_job) so it never
+interleaves with a sync writing the same notices. If SAM later re-lists an archived
+notice, sync inserts it into the hot collection again; the hot copy wins on reads and
+the next archive run replaces the cold copy.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ReplaceOne
+
+from models.opportunity import get_archive_collection, get_opportunities_collection
+from services import opportunity_cache, opportunity_stats, opportunity_suggest, recommendations
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH = 1000
+
+
+def archive_query(now: datetime) -> dict:
+    return {"$or": [{"active": {"$ne": "Yes"}}, {"archiveAt": {"$lt": now}}]}
+
+
+async def run_archive(batch_size: int = ARCHIVE_BATCH, now: Optional[datetime] = None) -> dict:
+    """
+    Move every archivable notice to the archive: per batch, one unordered upsert
+    bulk_write into the archive, then one delete_many from the hot collection, then
+    the rollup deltas for the notices that were still counted (active ones past archiveAt).
+    A crash between the two writes leaves a notice in both tiers; the next run finishes it.
+    Returns {"moved", "batches", "wasActive"}.
+    """
+    now = now or datetime.now(timezone.utc)
+    hot, cold = get_opportunities_collection(), get_archive_collection()
+    query = archive_query(now)
+
+    moved = batches = 0
+    was_active: list[str] = []
+    while True:
+        batch = await hot.find(query).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+        await cold.bulk_write(
+            [
+                ReplaceOne(
+                    {"noticeId": d["noticeId"]},
+                    {**{k: v for k, v in d.items() if k != "_id"}, "archivedAt": now},
+                    upsert=True,
+                )
+                for d in batch
+            ],
+            ordered=False,
+        )
+        result = await hot.delete_many({"_id": {"$in": [d["_id"] for d in batch]}})
+        previous = {d["noticeId"]: d for d in batch}
+        await opportunity_stats.apply_delta(opportunity_stats.delta_for(previous, previous, {}))
+        was_active.extend(d["noticeId"] for d in batch if d.get("active") == "Yes")
+        moved += result.deleted_count
+        batches += 1
+        if not result.deleted_count:
+            break  # nothing removed (concurrent archiver?); don't spin on the same batch
+
+    if moved:
+        await opportunity_cache.bump_version()
+        # Only notices that were active are in the typeahead index and company feeds.
+        opportunity_suggest.forget(was_active)
+        if was_active:
+            try:
+                await recommendations.refresh_for_opportunities(was_active)
+            except Exception:
+                logger.exception("[ARCHIVE] Recommendation refresh failed for %d notices", len(was_active))
+    logger.info("[ARCHIVE] Moved %d opportunities in %d batches", moved, batches)
+    return {"moved": moved, "batches": batches, "wasActive": len(was_active)}
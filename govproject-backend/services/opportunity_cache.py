@@ -0,0 +1,164 @@
+"""
+In-process caches for opportunity listings.
+The collection only changes when sync writes, and sync bumps a version counter in
+db["meta"] when it commits a page. Everything cached here is tied to that version:
+totals, the active-vs-all base query, and an LRU of serialized listing pages that
+also backs the weak ETag on GET /opportunities. Workers re-read the version at most
+every OPPORTUNITY_VERSION_TTL seconds, so conditional GETs usually never reach Mongo.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+ACTIVE_QUERY = {"active": "Yes"}
+TOTALS_TTL = float(os.getenv("OPPORTUNITY_TOTALS_TTL", "60"))
+MAX_CACHED_TOTALS = 256  # filters (e.g. deadline windows) make the key space open-ended
+VERSION_KEY = "opportunities_version"
+VERSION_TTL = float(os.getenv("OPPORTUNITY_VERSION_TTL", "5"))
+PAGE_CACHE_SIZE = int(os.getenv("OPPORTUNITY_PAGE_CACHE_SIZE", "256"))
+PAGE_CACHE_MAX_BYTES = int(float(os.getenv("OPPORTUNITY_PAGE_CACHE_MB", "64")) * 2**20)
+PAGE_CACHE_MAX_ENTRY = PAGE_CACHE_MAX_BYTES // 8  # a larger body would evict most of the cache for one page
+
+_version: Optional[tuple[float, int]] = None
+_pages: "OrderedDict[tuple[int, str], bytes]" = OrderedDict()
+_pages_bytes = 0
+
+_base_query: Optional[tuple[float, dict]] = None
+_totals: dict[str, tuple[float, int]] = {}
+_active_ratio: Optional[float] = None  # exact active count / estimated collection size, for approximate totals
+
+
+def _fresh(stamp: float) -> bool:
+    return time.monotonic() - stamp < TOTALS_TTL
+
+
+def _key(query: dict) -> str:
+    return repr(sorted(query.items()))
+
+
+def invalidate() -> None:
+    """Drop everything derived from the collection (totals, base query, cached pages)."""
+    global _base_query, _pages_bytes
+    _base_query = None
+    _totals.clear()
+    _pages.clear()
+    _pages_bytes = 0
+
+
+def _meta():
+    from db import db
+    return db["meta"]
+
+
+def _set_version(version: int) -> None:
+    global _version
+    if _version is None or _version[1] != version:
+        invalidate()
+    _version = (time.monotonic(), version)
+
+
+async def current_version() -> int:
+    """Collection version; served from memory for VERSION_TTL seconds between Mongo reads."""
+    if _version and time.monotonic() - _version[0] < VERSION_TTL:
+        return _version[1]
+    doc = await _meta().find_one({"_id": VERSION_KEY})
+    _set_version(int((doc or {}).get("version", 0)))
+    return _version[1]
+
+
+async def bump_version() -> int:
+    """Call after any write to opportunities (sync, archive, scripts): new version in Mongo, local caches dropped now."""
+    doc = await _meta().find_one_and_update(
+        {"_id": VERSION_KEY},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _set_version(int(doc["version"]))
+    return _version[1]
+
+
+# --- Conditional GET and serialized-page LRU ---
+
+
+def params_key(params) -> str:
+    """Order-independent key for a request's query parameters (list of (name, value))."""
+    return "&".join(f"{k}={v}" for k, v in sorted(params))
+
+
+def make_etag(version: int, key: str) -> str:
+    return f'W/"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" match.
+    bare = etag.removeprefix("W/")
+    return "*" in tags or any(t.removeprefix("W/") == bare for t in tags)
+
+
+def get_page(version: int, key: str) -> Optional[bytes]:
+    body = _pages.get((version, key))
+    if body is not None:
+        _pages.move_to_end((version, key))
+    return body
+
+
+def put_page(version: int, key: str, body: bytes) -> None:
+    """Cache a serialized page; bounded by PAGE_CACHE_SIZE entries and PAGE_CACHE_MAX_BYTES in total."""
+    global _pages_bytes
+    if len(body) > PAGE_CACHE_MAX_ENTRY:
+        return
+    old = _pages.pop((version, key), None)
+    if old is not None:
+        _pages_bytes -= len(old)
+    _pages[(version, key)] = body
+    _pages_bytes += len(body)
+    while len(_pages) > PAGE_CACHE_SIZE or _pages_bytes > PAGE_CACHE_MAX_BYTES:
+        _, evicted = _pages.popitem(last=False)
+        _pages_bytes -= len(evicted)
+
+
+async def listing_base_query(coll) -> dict:
+    """{"active": "Yes"} if any active opportunity exists, else {} (all). Cached."""
+    global _base_query
+    if _base_query and _fresh(_base_query[0]):
+        return _base_query[1]
+    has_active = await coll.find_one(ACTIVE_QUERY, {"_id": 1})
+    query = dict(ACTIVE_QUERY) if has_active else {}
+    _base_query = (time.monotonic(), query)
+    return query
+
+
+async def count_total(coll, query: dict, *, estimated: bool = False) -> int:
+    """
+    Cached count_documents(query).
+    estimated=True avoids the index scan: estimated_document_count() for the whole
+    collection, or for the plain active listing that estimate scaled by the last
+    exact active ratio. Other queries (and the first call) count exactly.
+    """
+    global _active_ratio
+    key = _key(query)
+    hit = _totals.get(key)
+    if hit and _fresh(hit[0]):
+        return hit[1]
+
+    if estimated and (not query or (query == ACTIVE_QUERY and _active_ratio is not None)):
+        approx = await coll.estimated_document_count()
+        return approx if not query else round(approx * _active_ratio)
+
+    total = await coll.count_documents(query)
+    if len(_totals) >= MAX_CACHED_TOTALS:
+        _totals.clear()
+    _totals[key] = (time.monotonic(), total)
+    if query == ACTIVE_QUERY:
+        size = await coll.estimated_document_count()
+        _active_ratio = total / size if size else None
+    return total
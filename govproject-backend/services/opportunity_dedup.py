@@ -0,0 +1,164 @@
+"""
+Near-duplicate notices (amendments, pre-solicitation -> solicitation re-posts).
+Sync stores a MinHash signature of each notice's title + solicitation number, split
+into LSH band keys. Notices sharing a band key are candidates; candidates
+whose estimated Jaccard similarity reaches DUPLICATE_THRESHOLD are linked under one
+duplicateClusterId, which lets the proposal pipeline reuse a sibling's chunks,
+embeddings and retrieval instead of ingesting the same documents again.
+
+The description field is a SAM URL that embeds the noticeId, so it is not hashed.
+Neither is scopeOfWorkText: it is fetched after sync, for some notices only, and a
+signature must not depend on whether the prefetch has reached a notice yet.
+"""
+
+import re
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from db import db
+from models.opportunity import get_archive_collection, get_opportunities_collection
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 similarity usually share a band
+ROWS = NUM_PERM // BANDS
+DUPLICATE_THRESHOLD = 0.7  # amendments that only append "(Amendment 1)" to a title land around 0.8
+SHINGLE = 5  # characters
+
+_PRIME = np.uint64(4294967291)  # largest prime < 2**32; a*x + b stays below 2**64
+_rng = np.random.default_rng(20240611)  # fixed seed: signatures must be stable across processes
+_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)[:, None]
+
+SIGNATURE_PROJECTION = {"_id": 0, "noticeId": 1, "minhash": 1, "duplicateClusterId": 1}
+DUPLICATE_FIELDS = {
+    "_id": 0, "noticeId": 1, "title": 1, "solicitationNumber": 1, "type": 1, "postedDate": 1, "postedAt": 1,
+    "responseDeadLine": 1, "active": 1, "uiLink": 1, "resourceLinks": 1, "archivedAt": 1,
+}
+
+
+def _text(doc: dict) -> str:
+    parts = [doc.get("title"), doc.get("solicitationNumber")]
+    return re.sub(r"\s+", " ", " ".join(p for p in parts if p).lower()).strip()
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """NUM_PERM-value MinHash of the text's character shingles, or None for empty text."""
+    if not text:
+        return None
+    shingles = {text[i:i + SHINGLE] for i in range(max(1, len(text) - SHINGLE + 1))}
+    x = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_A * x[None, :] + _B) % _PRIME).min(axis=1)
+
+
+def lsh_bands(signature: np.ndarray) -> list[str]:
+    return [
+        f"{b}:{zlib.crc32(signature[b * ROWS:(b + 1) * ROWS].tobytes()):08x}"
+        for b in range(BANDS)
+    ]
+
+
+def similarity(a, b) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(np.asarray(a, dtype=np.uint64) == np.asarray(b, dtype=np.uint64)))
+
+
+def with_signature(doc: dict) -> dict:
+    """Set minhash / lshBands on an opportunity dict (in place), e.g. on from_sam() output."""
+    sig = minhash(_text(doc))
+    if sig is not None:
+        doc["minhash"] = sig.tolist()
+        doc["lshBands"] = lsh_bands(sig)
+    return doc
+
+
+async def assign_clusters(docs: list[dict]) -> int:
+    """
+    Link the given (just written) notices to their near-duplicates in the hot collection.
+    One $in query on lshBands fetches every candidate for the page; pairs at or above
+    DUPLICATE_THRESHOLD are unioned. Each resulting group keeps the smallest existing
+    duplicateClusterId among its members (else its smallest noticeId), and clusters that
+    the group bridges are merged into it. Returns the number of notices written.
+    """
+    docs = [d for d in docs if d.get("minhash")]
+    if not docs:
+        return 0
+    coll = get_opportunities_collection()
+    bands = sorted({b for d in docs for b in d["lshBands"]})
+    by_band: dict[str, list[str]] = {}
+    known: dict[str, dict] = {}
+    async for c in coll.find({"lshBands": {"$in": bands}}, {**SIGNATURE_PROJECTION, "lshBands": 1}):
+        known[c["noticeId"]] = c
+        for b in c.get("lshBands") or []:
+            by_band.setdefault(b, []).append(c["noticeId"])
+    for d in docs:
+        known[d["noticeId"]] = d  # as written: the replace cleared any previous cluster id
+
+    parent: dict[str, str] = {}
+
+    def find(x: str) -> str:
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for d in docs:
+        sig = d["minhash"]
+        for other in {o for b in d["lshBands"] for o in by_band.get(b, ())}:
+            if other != d["noticeId"] and similarity(sig, known[other]["minhash"]) >= DUPLICATE_THRESHOLD:
+                parent[find(d["noticeId"])] = find(other)
+
+    groups: dict[str, list[str]] = {}
+    for notice_id in list(parent):
+        groups.setdefault(find(notice_id), []).append(notice_id)
+
+    written = 0
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        existing = sorted({known[m]["duplicateClusterId"] for m in members if known[m].get("duplicateClusterId")})
+        cluster_id = existing[0] if existing else min(members)
+        if existing[1:]:
+            for target in (coll, get_archive_collection()):
+                await target.update_many(
+                    {"duplicateClusterId": {"$in": existing[1:]}}, {"$set": {"duplicateClusterId": cluster_id}}
+                )
+        result = await coll.update_many({"noticeId": {"$in": members}}, {"$set": {"duplicateClusterId": cluster_id}})
+        written += result.modified_count
+    return written
+
+
+async def find_duplicates(doc: dict) -> list[dict]:
+    """Other notices in doc's cluster, hot and archived, newest first."""
+    cluster_id = doc.get("duplicateClusterId")
+    if not cluster_id:
+        return []
+    query = {"duplicateClusterId": cluster_id, "noticeId": {"$ne": doc["noticeId"]}}
+    out = []
+    for coll in (get_opportunities_collection(), get_archive_collection()):
+        out += await coll.find(query, DUPLICATE_FIELDS).to_list(length=None)
+    seen = set()
+    unique = []
+    for d in sorted(out, key=lambda d: "archivedAt" in d):  # hot copy wins over a stale archived one
+        if d["noticeId"] not in seen:
+            seen.add(d["noticeId"])
+            unique.append(d)
+    # Same order as listings: postedAt desc (the raw postedDate string does not sort by date), unparsed last.
+    unique.sort(key=lambda d: (d.get("postedAt") is not None, d.get("postedAt") or 0, d["noticeId"]), reverse=True)
+    return unique
+
+
+async def sibling_with_chunks(doc: dict) -> Optional[str]:
+    """
+    A duplicate whose attachments are already ingested and whose resource links include
+    every one of doc's. SAM gives each uploaded file its own link, so an amendment that
+    adds or replaces a file (a revised SOW) gets its own ingest. None if none.
+    """
+    wanted = set(doc.get("resourceLinks") or [])
+    for sibling in await find_duplicates(doc):
+        if not wanted <= set(sibling.get("resourceLinks") or []):
+            continue
+        if await db.chunks.count_documents({"noticeId": sibling["noticeId"], "is_latest_version": True}, limit=1):
+            return sibling["noticeId"]
+    return None
@@ -0,0 +1,201 @@
+"""
+Notice description text, fetched once from SAM's noticedesc endpoint and stored on the
+opportunity (scopeOfWorkText, with descriptionFetchedAt), so drafts and refinements
+read it from Mongo instead of calling SAM each time.
+
+After each sync job, prefetch() fills in active notices that have no text yet, newest
+first, DESCRIPTION_CONCURRENCY at a time, within a daily budget of DESCRIPTION_DAILY_QUOTA
+requests. Every noticedesc call (prefetch or live) is counted per UTC day in
+db["meta"] (description_quota); only the prefetch is held to the budget, a user waiting
+on a draft is not.
+
+Re-fetch policy: sync replaces a notice's document when SAM changes it, which drops the
+stored text, so an amended notice is fetched again; unchanged notices keep theirs.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+from pymongo.errors import DuplicateKeyError
+
+from db import db
+from models.opportunity import get_archive_collection, get_opportunities_collection
+
+logger = logging.getLogger(__name__)
+
+QUOTA_KEY = "description_quota"
+DESCRIPTION_CONCURRENCY = int(os.getenv("DESCRIPTION_CONCURRENCY", "4"))
+DESCRIPTION_DAILY_QUOTA = int(os.getenv("DESCRIPTION_DAILY_QUOTA", "500"))  # prefetch requests per UTC day
+DESCRIPTION_TIMEOUT = 30.0
+
+# Active notices with a description URL whose text has not been fetched.
+PENDING_QUERY = {"active": "Yes", "description": {"$type": "string"}, "descriptionFetchedAt": {"$exists": False}}
+
+GONE_STATUSES = {404, 410}  # no description for this notice: stored as empty text
+STOP_STATUSES = {401, 403, 429}  # key rejected or rate limited: stop the prefetch run
+
+_prefetch_lock = asyncio.Lock()
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# --- Quota ---
+
+
+async def _take_quota(limit: Optional[int]) -> None:
+    """Count one noticedesc request for today. With a limit, raise QuotaExhausted instead of exceeding it."""
+    meta = db["meta"]
+    today = _now().strftime("%Y-%m-%d")
+    try:
+        # First request of a new day resets the counter.
+        await meta.update_one({"_id": QUOTA_KEY, "day": {"$ne": today}}, {"$set": {"day": today, "used": 0}}, upsert=True)
+    except DuplicateKeyError:
+        pass  # today's counter already exists
+    query = {"_id": QUOTA_KEY, "day": today}
+    if limit is not None:
+        query["used"] = {"$lt": limit}
+    result = await meta.update_one(query, {"$inc": {"used": 1}})
+    if not result.modified_count:
+        raise QuotaExhausted(f"{limit} description requests already made today")
+
+
+async def quota_used() -> int:
+    doc = await db["meta"].find_one({"_id": QUOTA_KEY}) or {}
+    return doc.get("used", 0) if doc.get("day") == _now().strftime("%Y-%m-%d") else 0
+
+
+# --- Fetch and store ---
+
+
+async def fetch_description_text(description_url: str, client: Optional[httpx.AsyncClient] = None) -> str:
+    """
+    Fetch full description text from a SAM.gov description URL. Raises on HTTP errors;
+    returns "" when SAM_API_KEY is not set.
+    """
+    api_key = os.getenv("SAM_API_KEY")
+    if not api_key:
+        logger.warning("SAM_API_KEY not set, cannot fetch description text")
+        return ""
+    # Appended, not passed as params: httpx would replace the URL's own noticeid query.
+    separator = "&" if "?" in description_url else "?"
+    url_with_key = f"{description_url}{separator}api_key={api_key}"
+    if client is None:
+        async with httpx.AsyncClient(timeout=DESCRIPTION_TIMEOUT) as client:
+            response = await client.get(url_with_key)
+    else:
+        response = await client.get(url_with_key)
+    response.raise_for_status()
+    # Description endpoint returns text/plain or JSON with text field
+    if "application/json" in response.headers.get("content-type", "").lower():
+        data = response.json()
+        return data.get("noticeText") or data.get("description") or data.get("text") or response.text
+    return response.text
+
+
+async def _store(opp: dict, text: str) -> None:
+    """
+    Save text on the notice, hot and archived copies. The contentHash filter skips a
+    copy that sync replaced while the request was in flight (its text is due again).
+    """
+    query = {"noticeId": opp["noticeId"], "contentHash": opp.get("contentHash")}
+    update = {"$set": {"scopeOfWorkText": text, "descriptionFetchedAt": _now()}}
+    for coll in (get_opportunities_collection(), get_archive_collection()):
+        await coll.update_one(query, update)
+
+
+async def get_description(opp: dict) -> str:
+    """
+    The notice's description text: stored text when it has been fetched, else a live
+    fetch that is stored for next time. "" when there is none or the fetch fails.
+    """
+    if opp.get("descriptionFetchedAt") is not None:
+        return opp.get("scopeOfWorkText") or ""
+    url = opp.get("description")
+    if not url:
+        return ""
+    try:
+        await _take_quota(None)
+        text = await fetch_description_text(url)
+    except Exception as e:
+        logger.warning(f"Failed to fetch description from {url}: {e}")
+        return ""
+    if text and opp.get("noticeId"):
+        await _store(opp, text)
+        logger.info(f"[DESCRIPTION] Fetched {len(text)} characters for {opp['noticeId']}")
+    return text
+
+
+# --- Background prefetch ---
+
+
+async def prefetch(limit: Optional[int] = None) -> dict:
+    """
+    Fetch and store description text for pending active notices (PENDING_QUERY), newest
+    first, until none are left, the daily quota is spent, or `limit` were attempted.
+    A 404/410 stores empty text (nothing to fetch); any other error leaves the notice
+    pending, and a 401/403/429 (bad key or rate limit) ends the run.
+    Returns {"fetched", "empty", "failed", "quotaUsed"}.
+    """
+    counts = {"fetched": 0, "empty": 0, "failed": 0}
+    if not os.getenv("SAM_API_KEY"):
+        return {**counts, "quotaUsed": await quota_used()}
+
+    async with _prefetch_lock:
+        budget = max(0, DESCRIPTION_DAILY_QUOTA - await quota_used())
+        if limit is not None:
+            budget = min(budget, limit)
+        pending = []
+        if budget:
+            projection = {"_id": 0, "noticeId": 1, "description": 1, "contentHash": 1}
+            cursor = get_opportunities_collection().find(PENDING_QUERY, projection).sort("postedAt", -1)
+            pending = await cursor.limit(budget).to_list(length=budget)
+
+        stop = asyncio.Event()
+        queue = iter(pending)
+
+        async def worker(client: httpx.AsyncClient):
+            for opp in queue:
+                if stop.is_set():
+                    return
+                try:
+                    await _take_quota(DESCRIPTION_DAILY_QUOTA)
+                    text = await fetch_description_text(opp["description"], client)
+                except QuotaExhausted:
+                    stop.set()
+                    return
+                except httpx.HTTPStatusError as e:
+                    status = e.response.status_code
+                    if status in GONE_STATUSES:
+                        await _store(opp, "")
+                        counts["empty"] += 1
+                        continue
+                    counts["failed"] += 1
+                    if status in STOP_STATUSES:
+                        # Rate limited, or the key is expired/invalid: every other notice would fail the same way.
+                        logger.warning(f"[DESCRIPTION] SAM returned {status}; prefetch stopped")
+                        stop.set()
+                    continue
+                except httpx.HTTPError as e:
+                    logger.warning(f"[DESCRIPTION] Prefetch failed for {opp['noticeId']}: {e}")
+                    counts["failed"] += 1
+                    continue
+                await _store(opp, text)
+                counts["fetched" if text else "empty"] += 1
+
+        limits = httpx.Limits(max_connections=DESCRIPTION_CONCURRENCY)
+        async with httpx.AsyncClient(timeout=DESCRIPTION_TIMEOUT, limits=limits) as client:
+            await asyncio.gather(*(worker(client) for _ in range(max(1, DESCRIPTION_CONCURRENCY))))
+
+    result = {**counts, "quotaUsed": await quota_used()}
+    logger.info("[DESCRIPTION] Prefetch: %s", result)
+    return result
@@ -0,0 +1,65 @@
+"""
+Streaming export of opportunities as NDJSON or CSV.
+Rows go straight from a Motor cursor to the response one batch at a time, so memory
+stays flat regardless of collection size (no to_list, no skip/limit paging).
+"""
+
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator
+
+import orjson
+
+from services.opportunity_query import LISTING_SORT
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _csv_cell(v):
+    if v is None:
+        return ""
+    if isinstance(v, (list, dict)):
+        return orjson.dumps(v, default=str).decode()
+    if isinstance(v, datetime):
+        return v.isoformat()
+    return v
+
+
+async def iter_export(
+    coll,
+    query: dict,
+    projection: dict,
+    fmt: str = "ndjson",
+    batch_size: int = 1000,
+) -> AsyncIterator[bytes]:
+    """Yield the export body in chunks of about batch_size rows."""
+    cursor = coll.find(query, projection).sort(LISTING_SORT).batch_size(batch_size)
+    columns = [k for k in projection if k != "_id"]
+    text = io.StringIO()
+    writer = csv.writer(text)
+    chunk = bytearray()
+    if fmt == "csv":
+        writer.writerow(columns)
+
+    rows = 0
+    async for doc in cursor:
+        if fmt == "csv":
+            writer.writerow([_csv_cell(doc.get(c)) for c in columns])
+        else:
+            chunk += orjson.dumps(doc, default=str, option=orjson.OPT_APPEND_NEWLINE)
+        rows += 1
+        if rows % batch_size == 0:
+            yield _drain(text, chunk)
+    tail = _drain(text, chunk)
+    if tail:
+        yield tail
+
+
+def _drain(text: io.StringIO, chunk: bytearray) -> bytes:
+    """Return and reset whatever has been buffered (CSV text or NDJSON bytes)."""
+    out = text.getvalue().encode() + bytes(chunk)
+    text.seek(0)
+    text.truncate(0)
+    chunk.clear()
+    return out
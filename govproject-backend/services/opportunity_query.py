@@ -0,0 +1,178 @@
+"""
+Query building for opportunity listings: sort order, keyset (cursor) pagination,
+list projections, and the filtered/faceted search pipeline.
+Cursors are opaque to clients: base64url of the last row's (postedAt, noticeId).
+"""
+
+import base64
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+import orjson
+
+from models.opportunity import GovPreneursOpportunity
+
+# Served by the (active, postedAt, noticeId) / (postedAt, noticeId) compound indexes.
+# postedAt is the parsed BSON date: the raw postedDate strings mix formats and sort
+# lexicographically, not by time. noticeId (unique) is the tie-breaker rather than _id
+# so list projections can drop _id.
+LISTING_SORT = [("postedAt", -1), ("noticeId", -1)]
+
+
+def encode_cursor(doc: dict) -> str:
+    """Cursor pointing just after doc in LISTING_SORT order."""
+    raw = orjson.dumps([doc.get("postedAt"), doc["noticeId"]])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[datetime], str]:
+    """Inverse of encode_cursor. Raises ValueError for anything we did not issue."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        posted_at, notice_id = orjson.loads(raw)
+        if posted_at is not None:
+            posted_at = _utc(datetime.fromisoformat(posted_at))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(notice_id, str):
+        raise ValueError("Invalid cursor")
+    return posted_at, notice_id
+
+
+def after_cursor(query: dict, cursor: Optional[str]) -> dict:
+    """Restrict query to rows strictly after cursor in LISTING_SORT order."""
+    if not cursor:
+        return query
+    posted_at, notice_id = decode_cursor(cursor)
+    # Notices whose postedDate did not parse (postedAt null) sort last, descending.
+    if posted_at is None:
+        keyset = {"postedAt": None, "noticeId": {"$lt": notice_id}}
+    else:
+        keyset = {"$or": [
+            {"postedAt": {"$lt": posted_at}},
+            {"postedAt": posted_at, "noticeId": {"$lt": notice_id}},
+            {"postedAt": None},
+        ]}
+    return {"$and": [query, keyset]} if query else keyset
+
+
+def _utc(d) -> datetime:
+    """date -> midnight UTC; naive datetime -> UTC; aware datetime unchanged."""
+    if not isinstance(d, datetime):
+        return datetime.combine(d, time.min, tzinfo=timezone.utc)
+    return d if d.tzinfo else d.replace(tzinfo=timezone.utc)
+
+
+def deadline_filter(after=None, before=None) -> dict:
+    """Range on the parsed responseDeadlineAt (indexed, time-ordered): after <= deadline < before."""
+    rng = {}
+    if after:
+        rng["$gte"] = _utc(after)
+    if before:
+        rng["$lt"] = _utc(before)
+    return {"responseDeadlineAt": rng} if rng else {}
+
+
+# --- List projections ---
+
+# Bookkeeping fields never returned by listings.
+INTERNAL_FIELDS = frozenset({"contentHash", "minhash", "lshBands", "descriptionFetchedAt"})
+LISTING_FIELDS = tuple(f for f in GovPreneursOpportunity.model_fields if f not in INTERNAL_FIELDS)
+# Too large for the default "full" view; returned only when asked for in `fields`.
+DETAIL_FIELDS = frozenset({"scopeOfWorkText"})
+SUMMARY_FIELDS = (
+    "noticeId", "title", "solicitationNumber", "fullParentPathName", "postedDate", "responseDeadLine",
+    "type", "typeOfSetAside", "typeOfSetAsideDescription", "naicsCodes", "active", "uiLink",
+)
+# Defaults the frontend relies on, filled in by Mongo instead of a Python loop over items.
+LISTING_DEFAULTS = {"naicsCodes": [], "solicitationNumber": "", "typeOfSetAsideDescription": ""}
+CURSOR_FIELDS = ("noticeId", "postedAt")
+
+
+def listing_projection(view: str = "full", fields: Optional[list[str]] = None) -> dict:
+    """
+    find() projection for a listing view: "full", "summary", or an explicit field list.
+    _id is always dropped; cursor fields are always kept. Raises ValueError on unknown fields.
+    """
+    if fields:
+        unknown = [f for f in fields if f not in LISTING_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        names = list(dict.fromkeys([*CURSOR_FIELDS, *fields]))
+    elif view == "summary":
+        names = list(dict.fromkeys([*SUMMARY_FIELDS, *CURSOR_FIELDS]))
+    else:
+        names = [f for f in LISTING_FIELDS if f not in DETAIL_FIELDS]
+    proj = {"_id": 0}
+    for f in names:
+        proj[f] = {"$ifNull": [f"${f}", LISTING_DEFAULTS[f]]} if f in LISTING_DEFAULTS else 1
+    return proj
+
+
+# --- Search (GET /opportunities/search) ---
+
+FACET_LIMIT = 20
+
+
+def build_search_match(
+    *,
+    naics: Optional[list[str]] = None,
+    set_aside: Optional[list[str]] = None,
+    agency: Optional[str] = None,
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
+    q: Optional[str] = None,
+    active_only: bool = True,
+) -> dict:
+    """
+    $match for search. Each filter maps onto an index from ensure_indexes: naicsCodes,
+    typeOfSetAside, fullParentPathName (anchored, case-sensitive prefix regex),
+    responseDeadlineAt / (active, responseDeadlineAt), and the title text index.
+    deadline_to is inclusive of that whole day.
+    """
+    match: dict = {}
+    if q:
+        match["$text"] = {"$search": q}
+    if active_only:
+        match["active"] = "Yes"
+    if naics:
+        match["naicsCodes"] = {"$in": naics}
+    if set_aside:
+        match["typeOfSetAside"] = {"$in": set_aside}
+    if agency:
+        match["fullParentPathName"] = {"$regex": "^" + re.escape(agency)}
+    match.update(deadline_filter(deadline_from, deadline_to + timedelta(days=1) if deadline_to else None))
+    return match
+
+
+def _facet_count(expr) -> list[dict]:
+    return [
+        {"$group": {"_id": expr, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": FACET_LIMIT},
+    ]
+
+
+def build_search_pipeline(match: dict, *, scored: bool, offset: int, limit: int) -> list[dict]:
+    """
+    One aggregation: the indexed $match, the listing projection (so internal fields never
+    reach the response and $facet sorts slim documents), then a page of items plus facet
+    counts via $facet.
+    """
+    sort = {"score": -1, **dict(LISTING_SORT)} if scored else dict(LISTING_SORT)
+    items = [{"$sort": sort}, {"$skip": offset}, {"$limit": limit}]
+    projection = listing_projection("full")
+    if scored:
+        projection["score"] = {"$meta": "textScore"}
+    pipeline = [{"$match": match}, {"$project": projection}]
+    pipeline.append({"$facet": {
+        "items": items,
+        "total": [{"$count": "n"}],
+        "naics": [{"$unwind": "$naicsCodes"}, *_facet_count("$naicsCodes")],
+        "setAside": _facet_count("$typeOfSetAside"),
+        "agency": _facet_count(
+            {"$arrayElemAt": [{"$split": [{"$ifNull": ["$fullParentPathName", ""]}, "."]}, 0]}
+        ),
+    }})
+    return pipeline
@@ -0,0 +1,156 @@
+"""
+Columnar snapshots of the opportunities collection for analytics (Parquet via pyarrow).
+Each run appends one part file with the documents ingested since the previous run
+(ingestedAt watermark in db["meta"]), so agency / NAICS analytics read files instead of
+scanning Mongo. Nested fields are flattened to scalar columns; naicsCodes stays a list.
+A notice that changed appears again in a later part, as do the notices at the previous
+run's watermark (re-read in case that page was only partly visible then): dedupe on
+noticeId, latest ingestedAt.
+"""
+
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from pymongo import ReadPreference
+
+from models.opportunity import get_opportunities_collection, parse_sam_date
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", _PROJECT_ROOT / "snapshots")) / "opportunities"
+META_KEY = "opportunity_snapshot"
+BATCH_ROWS = 5000
+
+PROJECTION = {
+    "_id": 0, "noticeId": 1, "title": 1, "solicitationNumber": 1, "fullParentPathName": 1, "type": 1,
+    "typeOfSetAside": 1, "typeOfSetAsideDescription": 1, "naicsCode": 1, "naicsCodes": 1, "active": 1,
+    "postedAt": 1, "responseDeadlineAt": 1, "archiveAt": 1, "placeOfPerformance": 1, "pointOfContact": 1,
+    "uiLink": 1, "ingestedAt": 1,
+}
+
+
+def _schema():
+    import pyarrow as pa
+    ts = pa.timestamp("ms", tz="UTC")
+    return pa.schema([
+        ("noticeId", pa.string()),
+        ("title", pa.string()),
+        ("solicitationNumber", pa.string()),
+        ("agencyPath", pa.string()),
+        ("agency", pa.string()),
+        ("subTier", pa.string()),
+        ("office", pa.string()),
+        ("type", pa.string()),
+        ("typeOfSetAside", pa.string()),
+        ("typeOfSetAsideDescription", pa.string()),
+        ("naicsCode", pa.string()),
+        ("naicsCodes", pa.list_(pa.string())),
+        ("active", pa.bool_()),
+        ("postedAt", ts),
+        ("responseDeadlineAt", ts),
+        ("archiveAt", ts),
+        ("popCity", pa.string()),
+        ("popStateCode", pa.string()),
+        ("popCountryCode", pa.string()),
+        ("pocName", pa.string()),
+        ("pocEmail", pa.string()),
+        ("uiLink", pa.string()),
+        ("ingestedAt", ts),
+    ])
+
+
+def _utc(dt: Optional[datetime]) -> Optional[datetime]:
+    # Motor returns naive UTC datetimes
+    return dt.replace(tzinfo=timezone.utc) if dt and dt.tzinfo is None else dt
+
+
+def flatten(doc: dict) -> dict:
+    """One opportunity document -> one flat snapshot row."""
+    path = doc.get("fullParentPathName") or ""
+    levels = path.split(".") if path else []
+    pop = doc.get("placeOfPerformance") or {}
+    poc = (doc.get("pointOfContact") or [{}])[0] or {}
+    return {
+        "noticeId": doc.get("noticeId"),
+        "title": doc.get("title"),
+        "solicitationNumber": doc.get("solicitationNumber"),
+        "agencyPath": path or None,
+        "agency": levels[0] if len(levels) > 0 else None,
+        "subTier": levels[1] if len(levels) > 1 else None,
+        "office": levels[-1] if len(levels) > 2 else None,
+        "type": doc.get("type"),
+        "typeOfSetAside": doc.get("typeOfSetAside"),
+        "typeOfSetAsideDescription": doc.get("typeOfSetAsideDescription"),
+        "naicsCode": doc.get("naicsCode"),
+        "naicsCodes": doc.get("naicsCodes") or [],
+        "active": doc.get("active") == "Yes",
+        "postedAt": _utc(doc.get("postedAt")),
+        "responseDeadlineAt": _utc(doc.get("responseDeadlineAt")),
+        "archiveAt": _utc(doc.get("archiveAt")),
+        "popCity": (pop.get("city") or {}).get("name"),
+        "popStateCode": (pop.get("state") or {}).get("code"),
+        "popCountryCode": (pop.get("country") or {}).get("code"),
+        "pocName": poc.get("fullName"),
+        "pocEmail": poc.get("email"),
+        "uiLink": doc.get("uiLink"),
+        "ingestedAt": parse_sam_date(doc.get("ingestedAt")),
+    }
+
+
+async def run_snapshot(batch_rows: int = BATCH_ROWS) -> dict:
+    """
+    Append documents with ingestedAt > last watermark to a new zstd Parquet part file.
+    Reads from a secondary when one exists, in ingestedAt order over its index, with a
+    narrow projection; memory is one row group. The watermark only moves once the file
+    is complete, so a failed run is simply repeated.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Snapshots require: pip install pyarrow")
+    from db import db
+
+    meta = db["meta"]
+    state = await meta.find_one({"_id": META_KEY}) or {}
+    since = state.get("lastIngestedAt")
+    # $gte: a synced page shares one ingestedAt, and a lagging secondary may have shown only
+    # part of it last run. Rows at the watermark are exported again (dedupe on noticeId).
+    query = {"ingestedAt": {"$gte": since}} if since else {"ingestedAt": {"$exists": True}}
+
+    coll = get_opportunities_collection().with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+    cursor = coll.find(query, PROJECTION).sort("ingestedAt", 1).hint([("ingestedAt", 1)]).batch_size(batch_rows)
+
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    final_path = SNAPSHOT_DIR / f"part-{run_id}.parquet"
+    tmp_path = final_path.with_suffix(".parquet.tmp")
+    schema = _schema()
+
+    rows = 0
+    last = since
+    buffer = []
+    writer = None
+    try:
+        async for doc in cursor:
+            buffer.append(flatten(doc))
+            last = doc.get("ingestedAt") or last
+            if len(buffer) >= batch_rows:
+                writer = writer or pq.ParquetWriter(tmp_path, schema, compression="zstd")
+                writer.write_table(pa.Table.from_pylist(buffer, schema=schema))
+                rows += len(buffer)
+                buffer = []
+        if buffer:
+            writer = writer or pq.ParquetWriter(tmp_path, schema, compression="zstd")
+            writer.write_table(pa.Table.from_pylist(buffer, schema=schema))
+            rows += len(buffer)
+    finally:
+        if writer:
+            writer.close()
+
+    if not rows:
+        return {"rows": 0, "path": None, "lastIngestedAt": since}
+    os.replace(tmp_path, final_path)
+    await meta.update_one({"_id": META_KEY}, {"$set": {"lastIngestedAt": last, "lastPath": str(final_path)}}, upsert=True)
+    return {"rows": rows, "path": str(final_path), "lastIngestedAt": last}
@@ -0,0 +1,138 @@
+"""
+Rollup counts of active opportunities (the opportunity_stats collection), so
+GET /opportunities/stats reads a few small documents instead of aggregating the
+whole collection. One document per (dim, value):
+
+  agency    – every prefix of fullParentPathName ("DEPT OF DEFENSE",
+              "DEPT OF DEFENSE.DEPT OF THE ARMY", ...) with its parent, for drill-down
+  naics     – each NAICS code on the notice
+  setAside  – typeOfSetAside ("NONE" when unrestricted)
+  deadline  – responseDeadlineAt month, "YYYY-MM" ("NONE" when missing)
+
+Sync applies deltas: for each notice it writes, the old document's keys (read in the
+same $in query as the content hash) are decremented and the new ones incremented.
+rebuild() recomputes everything from the collection for repairs.
+"""
+
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from pymongo import UpdateOne
+
+from db import db
+
+COLLECTION_NAME = "opportunity_stats"
+DIMENSIONS = ("agency", "naics", "setAside", "deadline")
+NONE_VALUE = "NONE"
+# Fields rollup_keys reads; passed to bulk_upsert_opportunities(previous_fields=...).
+ROLLUP_FIELDS = ("active", "fullParentPathName", "naicsCode", "naicsCodes", "typeOfSetAside", "responseDeadlineAt")
+
+Key = tuple[str, str]  # (dim, value)
+
+
+def get_stats_collection():
+    return db[COLLECTION_NAME]
+
+
+async def ensure_indexes():
+    await get_stats_collection().create_index([("dim", 1), ("parent", 1), ("count", -1)])
+
+
+def rollup_keys(doc: Optional[dict]) -> list[Key]:
+    """Buckets one opportunity counts towards (none unless active)."""
+    if not doc or doc.get("active") != "Yes":
+        return []
+    keys: list[Key] = []
+    segments = [s for s in (doc.get("fullParentPathName") or "").split(".") if s]
+    for depth in range(1, len(segments) + 1):
+        keys.append(("agency", ".".join(segments[:depth])))
+    naics = set(doc.get("naicsCodes") or []) or ({doc["naicsCode"]} if doc.get("naicsCode") else set())
+    keys.extend(("naics", code) for code in sorted(naics))
+    keys.append(("setAside", doc.get("typeOfSetAside") or NONE_VALUE))
+    deadline = doc.get("responseDeadlineAt")
+    keys.append(("deadline", deadline.strftime("%Y-%m") if isinstance(deadline, datetime) else NONE_VALUE))
+    return keys
+
+
+def delta_for(changed: Iterable[str], previous: dict[str, dict], current: dict[str, Optional[dict]]) -> Counter:
+    """Count changes for notices changed from previous[id] (absent = new) to current[id] (None = removed)."""
+    delta: Counter = Counter()
+    for notice_id in changed:
+        delta.update(rollup_keys(current.get(notice_id)))
+        delta.subtract(rollup_keys(previous.get(notice_id)))
+    return delta
+
+
+def _stat_doc(key: Key) -> dict:
+    dim, value = key
+    doc = {"dim": dim, "value": value}
+    if dim == "agency":
+        doc["level"] = value.count(".") + 1
+        doc["parent"] = value.rpartition(".")[0] or None
+    return doc
+
+
+async def apply_delta(delta: Counter) -> int:
+    """$inc the rollups in one unordered bulk_write and drop buckets that reached zero."""
+    ops = [
+        UpdateOne(
+            {"_id": f"{key[0]}:{key[1]}"},
+            {"$inc": {"count": n}, "$set": {**_stat_doc(key), "updatedAt": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        for key, n in delta.items()
+        if n
+    ]
+    if not ops:
+        return 0
+    coll = get_stats_collection()
+    await coll.bulk_write(ops, ordered=False)
+    if any(n < 0 for n in delta.values()):
+        await coll.delete_many({"count": {"$lte": 0}})
+    return len(ops)
+
+
+async def rebuild() -> int:
+    """
+    Recompute every rollup from the active opportunities into a scratch collection,
+    then rename it over opportunity_stats, so readers never see a partial rebuild.
+    Returns the number of buckets.
+    """
+    from models.opportunity import get_opportunities_collection
+
+    counts: Counter = Counter()
+    projection = {"_id": 0, **{f: 1 for f in ROLLUP_FIELDS}}
+    async for doc in get_opportunities_collection().find({"active": "Yes"}, projection).batch_size(5000):
+        counts.update(rollup_keys(doc))
+
+    scratch = db[f"{COLLECTION_NAME}_rebuild"]
+    await scratch.drop()
+    now = datetime.now(timezone.utc)
+    docs = [{"_id": f"{k[0]}:{k[1]}", **_stat_doc(k), "count": n, "updatedAt": now} for k, n in counts.items()]
+    for i in range(0, len(docs), 5000):
+        await scratch.insert_many(docs[i:i + 5000])
+    if docs:
+        await scratch.rename(COLLECTION_NAME, dropTarget=True)
+    else:
+        await get_stats_collection().delete_many({})
+    await ensure_indexes()
+    return len(docs)
+
+
+async def read_stats(dim: Optional[str] = None, parent: Optional[str] = None, limit: int = 50) -> dict:
+    """
+    Top `limit` buckets per dimension by count (deadline months in date order).
+    Agencies are one hierarchy level at a time: top-level by default, children of
+    `parent` when given.
+    """
+    coll = get_stats_collection()
+    out = {}
+    for d in [dim] if dim else DIMENSIONS:
+        query = {"dim": d}
+        if d == "agency":
+            query["parent"] = parent or None
+        sort = [("value", 1)] if d == "deadline" else [("count", -1)]  # deadline months in calendar order
+        cursor = coll.find(query, {"_id": 0, "dim": 0, "updatedAt": 0}).sort(sort).limit(limit)
+        out[d] = await cursor.to_list(length=limit)
+    return out
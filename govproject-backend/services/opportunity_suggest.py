@@ -0,0 +1,261 @@
+"""
+In-process typeahead over active opportunities: solicitation numbers, agency names
+(segments of fullParentPathName) and title words, for GET /opportunities/suggest.
+Each kind is a sorted term array searched with bisect, so a prefix lookup is a
+binary search plus a short forward scan; the title text index cannot do prefixes.
+
+The index is built once at startup. Afterwards, whenever the opportunities version
+changes (sync committed a page, in this worker or another), documents with
+ingestedAt >= the last one seen are re-read and applied, so updates are incremental.
+Removals are read the same way from opportunities_archive (archivedAt past the last one
+seen, or at it and not yet applied), so notices archived by any process leave every
+worker's index.
+"""
+
+import asyncio
+import heapq
+import logging
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime
+from typing import Iterator, Optional
+
+from services import opportunity_cache
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_LIMIT = 10
+MIN_QUERY_LEN = 2
+AGENCY_SCAN_TERMS = 200  # agency terms examined before ranking by notice count
+
+PROJECTION = {"_id": 0, "noticeId": 1, "title": 1, "solicitationNumber": 1, "fullParentPathName": 1, "active": 1, "ingestedAt": 1}
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Function words only. matching.STOPWORDS also drops domain words ("services", "support",
+# "contract") that are poor match signals but are exactly what users type into a title box.
+STOPWORDS = frozenset("a an and the of for to in on at by or with".split())
+
+
+def _words(text: str) -> list[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def _query_tokens(q: str) -> list[str]:
+    """Query words; the last one is a prefix still being typed, so it is kept even if it is a stopword ("an" -> "analysis")."""
+    *whole, last = _WORD.findall(q) or [""]
+    return [w for w in whole if w not in STOPWORDS] + ([last] if last else [])
+
+
+class PrefixIndex:
+    """Sorted term array + term -> postings set. insort/remove keep it sorted under incremental updates."""
+
+    def __init__(self):
+        self.terms: list[str] = []
+        self.postings: dict[str, set[str]] = {}
+
+    def add(self, term: str, value: str) -> None:
+        posting = self.postings.get(term)
+        if posting is None:
+            posting = self.postings[term] = set()
+            insort(self.terms, term)
+        posting.add(value)
+
+    def remove(self, term: str, value: str) -> None:
+        posting = self.postings.get(term)
+        if posting is None:
+            return
+        posting.discard(value)
+        if not posting:
+            del self.postings[term]
+            i = bisect_left(self.terms, term)
+            if i < len(self.terms) and self.terms[i] == term:
+                del self.terms[i]
+
+    def scan(self, prefix: str) -> Iterator[tuple[str, set[str]]]:
+        """(term, postings) for every term starting with prefix, in term order (exact match first)."""
+        i = bisect_left(self.terms, prefix)
+        while i < len(self.terms) and self.terms[i].startswith(prefix):
+            yield self.terms[i], self.postings[self.terms[i]]
+            i += 1
+
+
+def _agency_segments(path: Optional[str]) -> list[str]:
+    return [s.strip() for s in (path or "").split(".") if s.strip()]
+
+
+class SuggestIndex:
+    def __init__(self):
+        self.solicitations = PrefixIndex()  # lowercased solicitationNumber -> noticeIds
+        self.titles = PrefixIndex()  # title word -> noticeIds
+        self.agencies = PrefixIndex()  # agency name or word in it -> agency names
+        self.agency_counts: Counter[str] = Counter()
+        self.docs: dict[str, dict] = {}  # noticeId -> indexed fields, for removal and display
+        self.watermark: Optional[str] = None  # highest ingestedAt applied
+        self.archive_watermark: Optional[datetime] = None  # highest archivedAt applied
+        self.archive_seen: set[str] = set()  # noticeIds already applied at archive_watermark
+        self.version: Optional[int] = None
+
+    def _index(self, doc: dict, sign: int) -> None:
+        notice_id = doc["noticeId"]
+        op = PrefixIndex.add if sign > 0 else PrefixIndex.remove
+        if doc.get("solicitationNumber"):
+            op(self.solicitations, doc["solicitationNumber"].strip().lower(), notice_id)
+        for w in set(_words(doc.get("title") or "")):
+            op(self.titles, w, notice_id)
+        for name in set(_agency_segments(doc.get("fullParentPathName"))):
+            self.agency_counts[name] += sign
+            # Terms point at the name, so they only change when its first notice arrives or last one leaves.
+            if (sign > 0 and self.agency_counts[name] == 1) or (sign < 0 and self.agency_counts[name] == 0):
+                for term in {name.lower(), *_words(name)}:
+                    op(self.agencies, term, name)
+            if self.agency_counts[name] <= 0:
+                del self.agency_counts[name]
+
+    def apply(self, doc: dict) -> None:
+        """Insert, replace or (inactive) remove one opportunity."""
+        old = self.docs.pop(doc["noticeId"], None)
+        if old:
+            self._index(old, -1)
+        if doc.get("active") == "Yes":
+            kept = {k: doc.get(k) for k in ("noticeId", "title", "solicitationNumber", "fullParentPathName")}
+            self.docs[doc["noticeId"]] = kept
+            self._index(kept, +1)
+        ingested = doc.get("ingestedAt")
+        if ingested and (self.watermark is None or ingested > self.watermark):
+            self.watermark = ingested
+
+    def remove(self, notice_id: str) -> None:
+        old = self.docs.pop(notice_id, None)
+        if old:
+            self._index(old, -1)
+
+    def _title_matches(self, tokens: list[str], limit: int) -> list[str]:
+        *whole, last = tokens
+        # Earlier words must match whole title words (intersect from the rarest); the word
+        # being typed is a prefix. All set work is C-level; only `limit` ids reach Python.
+        candidates = None
+        for posting in sorted((self.titles.postings.get(w, set()) for w in whole), key=len):
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return []
+        out: dict[str, None] = {}  # ordered set
+        for _, posting in self.titles.scan(last):
+            hits = posting if candidates is None else candidates & posting
+            for notice_id in heapq.nsmallest(limit - len(out), hits - out.keys()):
+                out[notice_id] = None
+            if len(out) >= limit:
+                break
+        return list(out)
+
+    def suggest(self, q: str, limit: int = SUGGEST_LIMIT) -> dict:
+        q = q.strip().lower()
+        if len(q) < MIN_QUERY_LEN:
+            return {"solicitations": [], "agencies": [], "titles": []}
+
+        solicitations = []
+        for _, ids in self.solicitations.scan(q):
+            solicitations.extend(ids)
+            if len(solicitations) >= limit:
+                break
+
+        names: set[str] = set()
+        for i, (_, found) in enumerate(self.agencies.scan(q)):
+            names |= found
+            if i >= AGENCY_SCAN_TERMS:
+                break
+        agencies = sorted(names, key=lambda n: (-self.agency_counts[n], n))[:limit]
+
+        tokens = _query_tokens(q)
+        titles = self._title_matches(tokens, limit) if tokens else []
+
+        def notice(notice_id):
+            d = self.docs[notice_id]
+            return {"noticeId": notice_id, "title": d["title"], "solicitationNumber": d.get("solicitationNumber")}
+
+        return {
+            "solicitations": [notice(i) for i in solicitations[:limit]],
+            "agencies": [{"name": n, "count": self.agency_counts[n]} for n in agencies],
+            "titles": [notice(i) for i in titles],
+        }
+
+
+_index = SuggestIndex()
+_lock = asyncio.Lock()
+_built = False
+
+
+async def build() -> int:
+    """Load every active opportunity into a fresh index (startup). Returns the number indexed."""
+    global _index, _built
+    from models.opportunity import get_archive_collection, get_opportunities_collection
+    async with _lock:
+        index = SuggestIndex()
+        index.version = await opportunity_cache.current_version()
+        latest = await get_archive_collection().find_one({}, {"_id": 0, "archivedAt": 1}, sort=[("archivedAt", -1)])
+        index.archive_watermark = (latest or {}).get("archivedAt")
+        if index.archive_watermark is not None:
+            index.archive_seen = set(await get_archive_collection().distinct("noticeId", {"archivedAt": index.archive_watermark}))
+        async for doc in get_opportunities_collection().find({"active": "Yes"}, PROJECTION):
+            index.apply(doc)
+        _index, _built = index, True
+        return len(index.docs)
+
+
+async def refresh() -> SuggestIndex:
+    """Apply documents written since the last refresh, if the opportunities version moved."""
+    if not _built:
+        await build()
+        return _index
+    version = await opportunity_cache.current_version()
+    if version == _index.version:
+        return _index
+    from models.opportunity import get_archive_collection, get_opportunities_collection
+    async with _lock:
+        if version != _index.version:
+            hot = get_opportunities_collection()
+            # $gte: a page shares one ingestedAt and may have been only partly visible last time.
+            query = {"ingestedAt": {"$gte": _index.watermark}} if _index.watermark else {"ingestedAt": {"$exists": True}}
+            async for doc in hot.find(query, PROJECTION):
+                _index.apply(doc)
+            await _apply_archived(get_archive_collection(), hot)
+            _index.version = version
+    return _index
+
+
+async def _apply_archived(archive, hot) -> None:
+    """
+    Remove notices archived since the last refresh. An archive run stamps all its batches
+    with one archivedAt, so documents at the watermark can still arrive; those already
+    applied (archive_seen) are excluded instead of being re-read on every refresh.
+    """
+    mark, seen = _index.archive_watermark, _index.archive_seen
+    if mark is None:
+        query = {}
+    else:
+        query = {"$or": [{"archivedAt": {"$gt": mark}}, {"archivedAt": mark, "noticeId": {"$nin": list(seen)}}]}
+    archived = []
+    async for doc in archive.find(query, {"_id": 0, "noticeId": 1, "archivedAt": 1}).sort("archivedAt", 1):
+        archived.append(doc["noticeId"])
+        if mark is None or doc["archivedAt"] > mark:
+            mark, seen = doc["archivedAt"], set()
+        seen.add(doc["noticeId"])
+    _index.archive_watermark, _index.archive_seen = mark, seen
+    if not archived:
+        return
+    forget(archived)
+    # A notice SAM re-listed after it was archived is back in the hot collection; the hot copy wins.
+    async for doc in hot.find({"noticeId": {"$in": archived}}, PROJECTION):
+        _index.apply(doc)
+
+
+def forget(notice_ids) -> None:
+    """Drop notices that left the collection (e.g. archived) from this worker's index now; other workers
+    pick the removals up from the archive on their next refresh."""
+    for notice_id in notice_ids:
+        _index.remove(notice_id)
+
+
+async def suggest(q: str, limit: int = SUGGEST_LIMIT) -> dict:
+    index = await refresh()
+    return index.suggest(q, limit)
@@ -1,122 +1,33 @@
 """
 Proposal details (opportunity + company + attachments) and optional LLM draft.
-Attachments are downloaded under downloads/<noticeId>/ with safe filenames.
+Attachments come from the attachment cache (services.attachments) into downloads/<noticeId>/.
 """
 
+import asyncio
+import logging
 import os
-import re
-from urllib.parse import urlparse, unquote
-
-import httpx
+import time
+from typing import Optional
 
 from clients import GeminiClient
+from services.attachments import ATTACHMENTS_DIR, download_attachments
+from services.opportunity_descriptions import get_description
+
+logger = logging.getLogger(__name__)
 
 # --- Constants ---
 
-ATTACHMENTS_DIR = "downloads"
-DUMMY_SCOPE_TEXT = "[Scope of work not fetched. Description URL available; append API key to fetch when quota allows.]"
-
-CONTENT_TYPE_TO_EXT = {
-    "application/pdf": ".pdf",
-    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": ".xlsx",
-    "application/vnd.ms-excel": ".xls",
-    "application/msword": ".doc",
-    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
-    "application/zip": ".zip",
-    "text/plain": ".txt",
-    "text/html": ".html",
+# Seconds each get_proposal_details stage may take; per-file download limits still apply inside "attachments".
+STAGE_TIMEOUTS = {
+    "dedup": 10.0,
+    "attachments": float(os.getenv("PROPOSAL_ATTACHMENTS_TIMEOUT", "300")),
+    "description": 45.0,
+    "ingest": float(os.getenv("PROPOSAL_INGEST_TIMEOUT", "600")),
+    "retrieve": 60.0,
+    "draft": float(os.getenv("PROPOSAL_DRAFT_TIMEOUT", "240")),
 }
+DUMMY_SCOPE_TEXT = "[Scope of work not fetched yet. Description URL available; it is fetched after sync as daily quota allows.]"
 
-# --- Attachment download helpers ---
-
-
-def _safe_basename(name: str) -> str:
-    """Sanitize a string for use as a filename."""
-    s = re.sub(r"[^\w\-_. ]", "_", unquote(name).strip())
-    return s[:200] if s else ""
-
-
-def _filename_from_response(response, url: str, index: int) -> str:
-    """Choose filename from Content-Disposition, URL path, or fallback to attachment_{index}.ext."""
-    content_disp = (response.headers.get("content-disposition") or "").lower()
-    if "filename=" in content_disp:
-        part = content_disp.split("filename=", 1)[-1].strip().strip('"\'')
-        if ";" in part:
-            part = part.split(";")[0].strip()
-        name = _safe_basename(part)
-        if name and name.lower() != "download":
-            return name
-    name = _safe_basename(os.path.basename(urlparse(url).path))
-    if name and name.lower() != "download":
-        return name
-    content_type = (response.headers.get("content-type") or "").split(";")[0].strip().lower()
-    ext = CONTENT_TYPE_TO_EXT.get(content_type, "")
-    return f"attachment_{index}{ext}"
-
-
-def _download_one(url: str, dir_path: str, index: int, timeout: float = 30.0) -> tuple[bool, str | None, str]:
-    """Download one URL into dir_path. Returns (success, error_message, filename)."""
-    try:
-        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-            response = client.get(url)
-            response.raise_for_status()
-            filename = _filename_from_response(response, url, index)
-            os.makedirs(dir_path, exist_ok=True)
-            path = os.path.normpath(os.path.join(dir_path, filename))
-            with open(path, "wb") as f:
-                f.write(response.content)
-            return True, None, filename
-    except Exception as e:
-        return False, str(e), ""
-
-
-def download_attachments(notice_id: str, resource_links: list[str]) -> list[dict]:
-    """Download each resource link into downloads/<notice_id>/; return list of {url, localPath, success, error?}."""
-    base_dir = os.path.join(ATTACHMENTS_DIR, notice_id or "unknown")
-    result = []
-    for i, url in enumerate(resource_links):
-        if not (url and isinstance(url, str)):
-            continue
-        success, error, filename = _download_one(url, base_dir, i)
-        local_path = os.path.normpath(os.path.join(base_dir, filename)) if filename else ""
-        item = {"url": url, "localPath": local_path, "success": success}
-        if error:
-            item["error"] = error
-        result.append(item)
-    return result
-
-
-async def fetch_description_text(description_url: str) -> str:
-    """Fetch full description text from SAM.gov description URL."""
-    if not description_url:
-        return ""
-    
-    api_key = os.getenv("SAM_API_KEY")
-    if not api_key:
-        import logging
-        logging.getLogger(__name__).warning("SAM_API_KEY not set, cannot fetch description text")
-        return ""
-    
-    try:
-        # Append API key to URL
-        separator = "&" if "?" in description_url else "?"
-        url_with_key = f"{description_url}{separator}api_key={api_key}"
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url_with_key)
-            response.raise_for_status()
-            # Description endpoint returns text/plain or JSON with text field
-            content_type = response.headers.get("content-type", "").lower()
-            if "application/json" in content_type:
-                data = response.json()
-                # Try common field names
-                return data.get("noticeText") or data.get("description") or data.get("text") or response.text
-            else:
-                return response.text
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning(f"Failed to fetch description from {description_url}: {e}")
-        return ""
 
 # --- Proposal details (opportunity + company + attachments) ---
 
@@ -133,11 +44,11 @@ COMPANY_KEYS = (
 )
 
 
-def _to_opportunity_details(opp: dict) -> dict:
+def _to_opportunity_details(opp: dict, description_text: str = "") -> dict:
     out = {k: opp.get(k) for k in OPPORTUNITY_KEYS}
     out["descriptionUrl"] = opp.get("description")
-    out["scopeOfWorkText"] = opp.get("scopeOfWorkText") or DUMMY_SCOPE_TEXT
-    out["descriptionNote"] = "Append API key to descriptionUrl to fetch full text (not requested now; quota)."
+    out["scopeOfWorkText"] = description_text or opp.get("scopeOfWorkText") or DUMMY_SCOPE_TEXT
+    out["descriptionNote"] = "Full notice text from descriptionUrl, fetched once and stored (scopeOfWorkText)."
     return out
 
 
@@ -145,6 +56,26 @@ def _to_company_details(profile: dict) -> dict:
     return {k: profile.get(k) for k in COMPANY_KEYS}
 
 
+async def _stage(name: str, coro, timeout: float, default, timings: dict, errors: dict):
+    """
+    Await one pipeline stage with a timeout, recording its wall time in timings[name] (ms).
+    A failure or timeout is logged and recorded in errors[name], and the stage yields
+    `default` so the stages after it still run.
+    """
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        errors[name] = f"Timed out after {timeout:.0f}s"
+        logger.warning(f"[PROPOSAL] Stage {name} timed out after {timeout:.0f}s")
+    except Exception as e:
+        errors[name] = str(e)
+        logger.error(f"[PROPOSAL] Stage {name} failed: {e}", exc_info=True)
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    return default
+
+
 async def get_proposal_details(
     opp: dict,
     profile: dict,
@@ -152,60 +83,90 @@ async def get_proposal_details(
     rag_top_k: int = 10,
     include_draft: bool = True,
 ) -> dict:
-    """Build full proposal payload: opportunity, company, attachments, RAG chunks, and LLM draft."""
+    """
+    Build full proposal payload: opportunity, company, attachments, RAG chunks, and LLM draft.
+
+    Stages run as a small DAG, each as soon as its inputs are ready:
+
+        description ─────────────────────────────────────────┐
+        dedup ─> attachments ─> ingest ─> retrieve ───────────┴─> draft
+
+    so end-to-end latency is the longer branch plus the draft, not the sum. Every stage
+    but the draft degrades on failure or timeout (STAGE_TIMEOUTS) to an empty result,
+    reported in stageErrors; the draft raises. Wall time per stage, in ms, is in timings.
+    """
+    started = time.perf_counter()
     notice_id = opp.get("noticeId") or ""
     resource_links = opp.get("resourceLinks") or []
-    stored_files = download_attachments(notice_id, resource_links)
-    folder_for_notice = os.path.join(ATTACHMENTS_DIR, notice_id) if notice_id else ATTACHMENTS_DIR
-
-    # Fetch full description text from description URL
-    description_text = ""
-    description_url = opp.get("description")
-    if description_url:
-        description_text = await fetch_description_text(description_url)
-        if description_text:
-            import logging
-            logging.getLogger(__name__).info(f"[DESCRIPTION] Fetched {len(description_text)} characters of description text")
-    
-    # RAG: ingest (so chunks have text in metadata) then retrieve
-    rag_chunks = []
-    if notice_id:
-        try:
-            import logging
-            logger = logging.getLogger(__name__)
-            from rag.ingest import run_ingest
-            from rag.retrieve import retrieve
-            await run_ingest(notice_id)
-            query = (opp.get("title") or "") + " scope requirements evaluation criteria"
-            from rag.retrieve import retrieve
-            rag_chunks = await retrieve(query.strip() or "requirements", top_k=rag_top_k, notice_id=notice_id)
-            logger.info(f"[CITATIONS] Retrieved {len(rag_chunks)} chunks for proposal generation")
-            if rag_chunks:
-                logger.info(f"[CITATIONS] First chunk metadata keys: {list(rag_chunks[0].get('metadata', {}).keys())}")
-        except FileNotFoundError:
-            rag_chunks = []
-        except Exception as e:
-            import logging
-            logging.getLogger(__name__).error(f"[CITATIONS] Error retrieving chunks: {e}", exc_info=True)
-            rag_chunks = []
+    timings: dict[str, float] = {}
+    errors: dict[str, str] = {}
+
+    async def rag_branch() -> tuple[Optional[str], list[dict], list[dict]]:
+        """Returns (reused_from, stored_files, rag_chunks)."""
+        from rag.ingest import run_ingest
+        from rag.retrieve import retrieve
+
+        # A near-duplicate (amendment / re-post) that was already ingested: reuse its files,
+        # chunks and embeddings instead of downloading and embedding the same documents again.
+        reused_from = None
+        if notice_id and opp.get("duplicateClusterId"):
+            from services.opportunity_dedup import sibling_with_chunks
+            reused_from = await _stage("dedup", sibling_with_chunks(opp), STAGE_TIMEOUTS["dedup"], None, timings, errors)
+        if not notice_id:
+            return None, [], []
+
+        stored_files = []
+        if reused_from:
+            logger.info(f"[DEDUP] {notice_id}: reusing chunks of near-duplicate {reused_from}")
+        else:
+            stored_files = await _stage(
+                "attachments", download_attachments(notice_id, resource_links),
+                STAGE_TIMEOUTS["attachments"], [], timings, errors,
+            )
+            # Ingest reads downloads/<noticeId>/; chunks get their text in metadata.
+            await _stage("ingest", run_ingest(notice_id), STAGE_TIMEOUTS["ingest"], 0, timings, errors)
+
+        query = (opp.get("title") or "") + " scope requirements evaluation criteria"
+        rag_chunks = await _stage(
+            "retrieve", retrieve(query.strip() or "requirements", top_k=rag_top_k, notice_id=reused_from or notice_id),
+            STAGE_TIMEOUTS["retrieve"], [], timings, errors,
+        )
+        logger.info(f"[CITATIONS] Retrieved {len(rag_chunks)} chunks for proposal generation")
+        return reused_from, stored_files, rag_chunks
+
+    # Full description text: stored by the post-sync prefetch, else fetched now and stored
+    description_text, (reused_from, stored_files, rag_chunks) = await asyncio.gather(
+        _stage("description", get_description(opp), STAGE_TIMEOUTS["description"], "", timings, errors),
+        rag_branch(),
+    )
 
+    rag_notice_id = reused_from or notice_id
     out = {
-        "opportunity": _to_opportunity_details(opp),
+        "opportunity": _to_opportunity_details(opp, description_text),
         "company": _to_company_details(profile),
         "attachments": {
             "folder": ATTACHMENTS_DIR,
-            "folderForNotice": folder_for_notice,
+            "folderForNotice": os.path.join(ATTACHMENTS_DIR, rag_notice_id) if rag_notice_id else ATTACHMENTS_DIR,
             "urls": resource_links,
             "storedFiles": stored_files,
-            "note": "Description URL not requested (quota). Use descriptionUrl + API key for notice text when needed.",
+            "reusedFrom": reused_from,
+            "note": "Files are shared through the attachment cache; storedFiles[].cache says whether each was fetched.",
         },
         "ragChunks": rag_chunks,
     }
 
     if include_draft:
         context = build_context(opp, profile, rag_chunks, description_text)
-        out["draft"] = generate_draft(context, rag_chunks)
+        draft_started = time.perf_counter()
+        # Gemini's client blocks; a worker thread keeps the event loop serving other requests.
+        out["draft"] = await asyncio.wait_for(
+            asyncio.to_thread(generate_draft, context, rag_chunks), STAGE_TIMEOUTS["draft"]
+        )
+        timings["draft"] = round((time.perf_counter() - draft_started) * 1000, 1)
 
+    timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    out["timings"] = timings
+    out["stageErrors"] = errors
     return out
 
 # --- Context text for LLM (used when draft generation is enabled) ---
@@ -222,8 +183,8 @@ def _build_opportunity_text(opp: dict, description_text: str = "") -> str:
         f"Set-Aside: {opp.get('typeOfSetAsideDescription') or opp.get('typeOfSetAside', '')}",
         f"NAICS: {', '.join(opp.get('naicsCodes') or [])}",
     ]
-    if opp.get("scopeOfWorkText"):
-        parts.append(f"Scope of Work:\n{opp['scopeOfWorkText']}")
+    # scopeOfWorkText is the stored copy of the same notice description; include it once.
+    description_text = description_text or opp.get("scopeOfWorkText") or ""
     if description_text:
         parts.append(f"\n--- FULL NOTICE DESCRIPTION ---\n{description_text}")
     elif opp.get("description"):
@@ -0,0 +1,132 @@
+"""
+Materialized per-company recommendation feeds (the recommendations collection).
+One document per company holds its top FEED_SIZE matches, best first, so the
+dashboard reads a feed with a single find_one on companyId. Feeds are kept fresh
+incrementally: after sync only the opportunities it wrote are scored against every
+profile and merged in; a profile change rebuilds that company's feed from the full
+match matrix (services.matching).
+"""
+
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from pymongo import UpdateOne
+
+from db import db
+from models.opportunity import get_opportunities_collection, parse_sam_date
+from models.user_profile import get_user_profiles_collection
+from services.matching import MATRIX_PROJECTION, OpportunityMatrix, get_matrix
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "recommendations"
+FEED_SIZE = int(os.getenv("RECOMMENDATION_FEED_SIZE", "100"))
+PROFILE_BATCH = 500
+
+# Fields match scoring reads from a profile.
+PROFILE_PROJECTION = {
+    "_id": 0, "companyId": 1, "naicsCodes": 1, "capabilities": 1, "certifications": 1,
+    "setAsideType": 1, "pastPerformance.keywords": 1,
+}
+
+
+def get_recommendations_collection():
+    return db[COLLECTION_NAME]
+
+
+async def ensure_indexes():
+    await get_recommendations_collection().create_index("companyId", unique=True)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _feed_update(company_id: str, items: list[dict], now: datetime) -> UpdateOne:
+    return UpdateOne(
+        {"companyId": company_id},
+        {"$set": {"items": items, "updatedAt": now}},
+        upsert=True,
+    )
+
+
+async def rebuild_feed(profile: dict) -> int:
+    """Recompute one company's feed against every active opportunity. Returns the feed length."""
+    matrix = await get_matrix()
+    items = matrix.score(profile, limit=FEED_SIZE, now=_now().timestamp())
+    await get_recommendations_collection().bulk_write([_feed_update(profile["companyId"], items, _now())])
+    return len(items)
+
+
+def merge_feed(current: list[dict], fresh: list[dict], changed: set[str], now: datetime) -> list[dict]:
+    """
+    Current feed minus changed (rescored or gone) and past-deadline notices, plus the
+    fresh scores for changed notices, best first, capped at FEED_SIZE.
+    """
+    kept = []
+    for item in current:
+        if item["noticeId"] in changed:
+            continue
+        deadline = parse_sam_date(item.get("responseDeadLine"))
+        if deadline and deadline < now:
+            continue
+        kept.append(item)
+    merged = kept + fresh
+    merged.sort(key=lambda i: i["score"], reverse=True)
+    return merged[:FEED_SIZE]
+
+
+async def refresh_for_opportunities(notice_ids: Iterable[str]) -> int:
+    """
+    Merge the given (just written) opportunities into every company's feed.
+    Only those notices are scored — a small OpportunityMatrix of the active ones — so
+    the cost is profiles x changed notices, not profiles x collection. Notices that
+    went inactive simply drop out. Returns the number of feeds written.
+    """
+    changed = set(notice_ids)
+    if not changed:
+        return 0
+    docs = await get_opportunities_collection().find(
+        {"noticeId": {"$in": list(changed)}, "active": "Yes"}, MATRIX_PROJECTION
+    ).to_list(length=None)
+    matrix = OpportunityMatrix(docs)
+    feeds = get_recommendations_collection()
+    now = _now()
+
+    written = 0
+    batch: list[dict] = []
+
+    async def flush():
+        nonlocal written
+        current = {
+            f["companyId"]: f.get("items") or []
+            async for f in feeds.find({"companyId": {"$in": [p["companyId"] for p in batch]}}, {"_id": 0})
+        }
+        ops = []
+        for profile in batch:
+            old = current.get(profile["companyId"], [])
+            fresh = matrix.score(profile, limit=FEED_SIZE, now=now.timestamp())
+            if not fresh and not any(i["noticeId"] in changed for i in old):
+                continue
+            ops.append(_feed_update(profile["companyId"], merge_feed(old, fresh, changed, now), now))
+        if ops:
+            await feeds.bulk_write(ops, ordered=False)
+            written += len(ops)
+        batch.clear()
+
+    async for profile in get_user_profiles_collection().find({"companyId": {"$exists": True}}, PROFILE_PROJECTION):
+        batch.append(profile)
+        if len(batch) >= PROFILE_BATCH:
+            await flush()
+    if batch:
+        await flush()
+    return written
+
+
+async def get_feed(company_id: str, limit: int = FEED_SIZE) -> Optional[dict]:
+    """Stored feed for a company (first `limit` items), or None if it has never been built."""
+    return await get_recommendations_collection().find_one(
+        {"companyId": company_id}, {"_id": 0, "items": {"$slice": limit}}
+    )
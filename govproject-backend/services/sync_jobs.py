@@ -0,0 +1,286 @@
+"""
+Background SAM.gov sync jobs.
+POST /sync enqueues a job instead of awaiting run_sync inside the request. Only one
+job runs at a time across all workers: a lease in db["meta"] (sync_lock) is the
+single-flight lock, renewed in the background while its holder runs (feed refreshes
+and Retry-After waits included). Progress lives in the sync_jobs collection.
+An optional in-process scheduler starts incremental syncs every SYNC_INTERVAL_MINUTES
+and archive runs (services.opportunity_archive) every ARCHIVE_INTERVAL_MINUTES; the
+archiver takes the same lease so it never overlaps a sync. After a successful sync,
+notice descriptions are prefetched (services.opportunity_descriptions) outside the lease.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from db import db
+from services import opportunity_descriptions
+from services.opportunity_archive import run_archive
+from sync import run_sync
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "sync_jobs"
+LOCK_KEY = "sync_lock"
+LOCK_TTL = timedelta(minutes=10)
+LOCK_RENEW_SECONDS = LOCK_TTL.total_seconds() / 3
+ARCHIVE_LEASE_PREFIX = "archive-"
+SYNC_INTERVAL_MINUTES = float(os.getenv("SYNC_INTERVAL_MINUTES", "0"))
+ARCHIVE_INTERVAL_MINUTES = float(os.getenv("ARCHIVE_INTERVAL_MINUTES", "0"))
+
+# Strong refs so running jobs are not garbage-collected mid-flight.
+_tasks: set[asyncio.Task] = set()
+_scheduler: Optional[asyncio.Task] = None
+_archiver: Optional[asyncio.Task] = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def get_sync_jobs_collection():
+    return db[JOBS_COLLECTION]
+
+
+def _public(job: dict) -> dict:
+    out = {k: v for k, v in job.items() if k != "_id"}
+    out["jobId"] = job["_id"]
+    return out
+
+
+async def _acquire_lock(job_id: str) -> Optional[str]:
+    """Take the sync lease for job_id. Returns None on success, else the jobId holding it."""
+    now = _now()
+    try:
+        await db["meta"].find_one_and_update(
+            {"_id": LOCK_KEY, "$or": [{"jobId": None}, {"expiresAt": {"$lt": now}}]},
+            {"$set": {"jobId": job_id, "expiresAt": now + LOCK_TTL}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        return None
+    except DuplicateKeyError:
+        # The filter didn't match (lease held and live), so the upsert collided on _id.
+        held = await db["meta"].find_one({"_id": LOCK_KEY})
+        return (held or {}).get("jobId")
+
+
+async def _renew_lock(job_id: str) -> None:
+    await db["meta"].update_one(
+        {"_id": LOCK_KEY, "jobId": job_id},
+        {"$set": {"expiresAt": _now() + LOCK_TTL}},
+    )
+
+
+async def _release_lock(job_id: str) -> None:
+    await db["meta"].update_one(
+        {"_id": LOCK_KEY, "jobId": job_id},
+        {"$set": {"jobId": None, "expiresAt": None}},
+    )
+
+
+@contextlib.asynccontextmanager
+async def _holding_lock(job_id: str):
+    """
+    Keep an acquired lease alive for the duration of the block by renewing it every
+    LOCK_RENEW_SECONDS (work between progress points, e.g. one long archive batch, can
+    outlast LOCK_TTL), then release it.
+    """
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(LOCK_RENEW_SECONDS)
+            try:
+                await _renew_lock(job_id)
+            except Exception as e:
+                logger.warning(f"[SYNC] Could not renew lease for {job_id}: {e}")
+
+    renewer = asyncio.create_task(heartbeat())
+    try:
+        yield
+    finally:
+        renewer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await renewer
+        await _release_lock(job_id)
+
+
+async def _fail_abandoned_jobs(except_job_id: str) -> None:
+    """A lease only expires when its worker died; mark such jobs failed so they don't read as running."""
+    await get_sync_jobs_collection().update_many(
+        {"status": {"$in": ["queued", "running"]}, "_id": {"$ne": except_job_id}},
+        {"$set": {"status": "failed", "finishedAt": _now(), "error": "Sync lease expired (worker stopped)."}},
+    )
+
+
+async def start_sync_job(window: Optional[str] = None, trigger: str = "api") -> tuple[dict, bool]:
+    """
+    Enqueue a sync job under the single-flight lock.
+    Returns (job, created); when a job is already running, returns that job and created=False.
+    When the archiver holds the lock there is no job to poll: jobId is None, heldBy "archive".
+    """
+    if not os.getenv("SAM_API_KEY"):
+        raise ValueError("SAM_API_KEY not set")
+
+    jobs = get_sync_jobs_collection()
+    job_id = uuid.uuid4().hex
+    holder = await _acquire_lock(job_id)
+    if holder:
+        if holder.startswith(ARCHIVE_LEASE_PREFIX):
+            return {"jobId": None, "status": "running", "heldBy": "archive"}, False
+        running = await jobs.find_one({"_id": holder})
+        if running:
+            return _public(running), False
+        # Lease held by a job we have no record of; report it without starting another.
+        return {"jobId": holder, "status": "running", "heldBy": "sync"}, False
+
+    await _fail_abandoned_jobs(job_id)
+    job = {
+        "_id": job_id,
+        "status": "queued",
+        "trigger": trigger,
+        "window": window,
+        "createdAt": _now(),
+        "pagesDone": 0,
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "failed": 0,
+        "recordsPerSec": 0.0,
+        "errors": [],
+    }
+    await jobs.insert_one(job)
+    _spawn(_run_job(job_id, window))
+    return _public(job), True
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _run_job(job_id: str, window: Optional[str]) -> None:
+    jobs = get_sync_jobs_collection()
+    started = time.perf_counter()
+    await jobs.update_one({"_id": job_id}, {"$set": {"status": "running", "startedAt": _now()}})
+
+    async def on_progress(stats: dict) -> None:
+        elapsed = time.perf_counter() - started
+        done = stats["inserted"] + stats["updated"] + stats["unchanged"]
+        await jobs.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "pagesDone": stats["pages"],
+                "windowsDone": stats["windows"],
+                "inserted": stats["inserted"],
+                "updated": stats["updated"],
+                "unchanged": stats["unchanged"],
+                "failed": stats["failed"],
+                "recordsPerSec": round(done / elapsed, 1) if elapsed > 0 else 0.0,
+                "errors": stats["errors"],
+            }},
+        )
+
+    # The lease is released only after the final status is written, so the next job's
+    # _fail_abandoned_jobs never sees this one as still running.
+    async with _holding_lock(job_id):
+        try:
+            result = await run_sync(window=window, on_progress=on_progress)
+            await on_progress(result)
+            await jobs.update_one(
+                {"_id": job_id},
+                {"$set": {"status": "succeeded", "finishedAt": _now(), "seconds": result["seconds"]}},
+            )
+            _spawn(_prefetch_descriptions(job_id))
+        except Exception as e:
+            logger.error(f"[SYNC] Job {job_id} failed: {e}", exc_info=True)
+            await jobs.update_one(
+                {"_id": job_id},
+                {"$set": {"status": "failed", "finishedAt": _now(), "error": str(e)}},
+            )
+
+
+async def _prefetch_descriptions(job_id: str) -> None:
+    """Fetch descriptions for the notices a sync job brought in; the counts land on the job as "descriptions"."""
+    try:
+        result = await opportunity_descriptions.prefetch()
+        await get_sync_jobs_collection().update_one({"_id": job_id}, {"$set": {"descriptions": result}})
+    except Exception as e:
+        logger.error(f"[DESCRIPTION] Prefetch after job {job_id} failed: {e}", exc_info=True)
+
+
+async def get_sync_job(job_id: str) -> Optional[dict]:
+    job = await get_sync_jobs_collection().find_one({"_id": job_id})
+    return _public(job) if job else None
+
+
+async def run_archive_job() -> Optional[dict]:
+    """Run the archiver under the sync lease. Returns its result, or None if a sync holds the lease."""
+    lease_id = f"{ARCHIVE_LEASE_PREFIX}{uuid.uuid4().hex}"
+    if await _acquire_lock(lease_id):
+        return None
+    async with _holding_lock(lease_id):
+        return await run_archive()
+
+
+# --- Periodic scheduler ---
+
+
+async def _scheduler_loop(interval_minutes: float) -> None:
+    while True:
+        try:
+            job, created = await start_sync_job(trigger="schedule")
+            if created:
+                logger.info(f"[SYNC] Scheduled job {job['jobId']} started")
+        except Exception as e:
+            logger.error(f"[SYNC] Scheduled sync could not start: {e}")
+        await asyncio.sleep(interval_minutes * 60)
+
+
+async def _archive_loop(interval_minutes: float) -> None:
+    while True:
+        # Sleep first: workers restart often and archiving is not urgent.
+        await asyncio.sleep(interval_minutes * 60)
+        try:
+            result = await run_archive_job()
+            if result is None:
+                logger.info("[ARCHIVE] Skipped; sync lease is held")
+        except Exception as e:
+            logger.error(f"[ARCHIVE] Scheduled archive failed: {e}", exc_info=True)
+
+
+def start_scheduler(
+    interval_minutes: float = SYNC_INTERVAL_MINUTES,
+    archive_interval_minutes: float = ARCHIVE_INTERVAL_MINUTES,
+) -> None:
+    """
+    Start incremental syncs every interval_minutes and archive runs every
+    archive_interval_minutes (each a no-op when <= 0). The Mongo lock keeps workers from overlapping.
+    """
+    global _scheduler, _archiver
+    if interval_minutes > 0 and _scheduler is None:
+        _scheduler = asyncio.create_task(_scheduler_loop(interval_minutes))
+    if archive_interval_minutes > 0 and _archiver is None:
+        _archiver = asyncio.create_task(_archive_loop(archive_interval_minutes))
+
+
+async def stop_scheduler() -> None:
+    global _scheduler, _archiver
+    for task in (_scheduler, _archiver):
+        if task is None:
+            continue
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _scheduler = _archiver = None
@@ -1,100 +1,213 @@
+import asyncio
+import logging
 import os
+import time
 from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
 
 import httpx
 
+from clients.sam_client import PAGE_SIZE, SamSearchClient
 from db import db
-from models.opportunity import ensure_indexes, upsert_opportunity
+from models.opportunity import bulk_upsert_opportunities, ensure_indexes, from_sam
+from services import opportunity_cache, opportunity_dedup, opportunity_stats, recommendations
 
-BASE = "https://api.sam.gov/opportunities/v2/search"
-LIMIT = 1000
 META_KEY = "sam_sync"
 MAX_DAYS = 365
+QUEUE_PAGES = 8  # downloaded pages allowed to wait for Mongo before fetchers block
+DATE_FMT = "%m/%d/%Y"
+WINDOW_DAYS = {"day": 1, "week": 7}
+WINDOW_RETRIES = 2
+MAX_REPORTED_ERRORS = 50
 
-KEYS = (
-    "noticeId", "title", "postedDate", "solicitationNumber", "fullParentPathName",
-    "type", "archiveDate", "typeOfSetAside", "typeOfSetAsideDescription", "responseDeadLine",
-    "naicsCode", "naicsCodes", "active", "description", "resourceLinks", "uiLink",
-)
-
-
-def _to_opp(sam):
-    o = {k: sam.get(k) for k in KEYS}
-    o["naicsCodes"] = o.get("naicsCodes") or []
-    if sam.get("pointOfContact"):
-        o["pointOfContact"] = [
-            {"fullName": p.get("fullName"), "email": p.get("email"), "phone": p.get("phone")}
-            for p in sam["pointOfContact"]
-        ]
-    if sam.get("placeOfPerformance"):
-        p = sam["placeOfPerformance"]
-        o["placeOfPerformance"] = {
-            "city": {"name": (p.get("city") or {}).get("name")},
-            "state": p.get("state"),
-            "country": p.get("country"),
-        }
-    return o
+ProgressCallback = Callable[[dict], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
 
 
 async def _ensure_last_sync():
+    """Return the sync meta doc ({lastSync, checkpoint?}), creating it on first run."""
     meta = db["meta"]
     doc = await meta.find_one({"_id": META_KEY})
     if not doc:
-        today = datetime.now(timezone.utc).strftime("%m/%d/%Y")
-        await meta.insert_one({"_id": META_KEY, "lastSync": today})
-        return today
-    return doc["lastSync"]
+        today = datetime.now(timezone.utc).strftime(DATE_FMT)
+        doc = {"_id": META_KEY, "lastSync": today}
+        await meta.insert_one(doc)
+    return doc
+
+
+async def _save_checkpoint(posted_from: str, posted_to: str, offset: int):
+    """Record that every page of the window below offset is committed."""
+    await db["meta"].update_one(
+        {"_id": META_KEY},
+        {"$set": {"checkpoint": {"postedFrom": posted_from, "postedTo": posted_to, "offset": offset}}},
+        upsert=True,
+    )
+
+
+async def _finish_window(posted_to: str):
+    """Advance lastSync past a fully committed window and drop its checkpoint."""
+    await db["meta"].update_one(
+        {"_id": META_KEY},
+        {"$set": {"lastSync": posted_to}, "$unset": {"checkpoint": ""}},
+        upsert=True,
+    )
+
+
+def _split_windows(start: datetime, end: datetime, window: str | None) -> list[tuple[str, str]]:
+    """Split [start, end] (inclusive days) into (postedFrom, postedTo) sub-windows of WINDOW_DAYS[window]."""
+    start, end = start.date(), end.date()
+    if not window:
+        return [(start.strftime(DATE_FMT), end.strftime(DATE_FMT))]
+    if window not in WINDOW_DAYS:
+        raise ValueError(f"Unknown sync window '{window}'; use one of {sorted(WINDOW_DAYS)}")
+    step = timedelta(days=WINDOW_DAYS[window])
+    out = []
+    cur = start
+    while cur <= end:
+        stop = min(cur + step - timedelta(days=1), end)
+        out.append((cur.strftime(DATE_FMT), stop.strftime(DATE_FMT)))
+        cur = stop + timedelta(days=1)
+    return out
 
 
-async def run_sync():
+async def _sync_window(
+    sam: SamSearchClient,
+    posted_from: str,
+    posted_to: str,
+    start_offset: int,
+    stats: dict,
+    changed: set[str],
+    on_progress: Optional[ProgressCallback] = None,
+):
+    """
+    Fetch and store one posted-date window starting at start_offset.
+    Pages finish out of order, so the checkpoint only moves to the lowest offset
+    below which every page is committed. noticeIds actually written are added to changed.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_PAGES)
+    committed = set()
+    watermark = start_offset
+
+    # Fetchers fill the queue while this loop writes, so throughput is bounded by
+    # the slower of SAM and Mongo rather than their sum.
+    producer = asyncio.create_task(
+        sam.fetch_pages(posted_from, posted_to, queue, start_offset=start_offset, limit=PAGE_SIZE)
+    )
+    try:
+        while (page := await queue.get()) is not None:
+            offset, data = page
+            if data:
+                records = [opportunity_dedup.with_signature(from_sam(opp)) for opp in data]
+                result = await bulk_upsert_opportunities(
+                    records, trusted=True, previous_fields=opportunity_stats.ROLLUP_FIELDS
+                )
+                for k in ("inserted", "updated", "unchanged"):
+                    stats[k] += result[k]
+                if result["changed"]:
+                    changed.update(result["changed"])
+                    current = {o["noticeId"]: o for o in records}
+                    await opportunity_stats.apply_delta(
+                        opportunity_stats.delta_for(result["changed"], result["previous"], current)
+                    )
+                    await opportunity_dedup.assign_clusters([current[i] for i in result["changed"]])
+                    await opportunity_cache.bump_version()
+                stats["failed"] += len(result["failed"])
+                for f in result["failed"]:
+                    logger.warning("[SYNC] Failed to store %s: %s", f["noticeId"], f["error"])
+                    if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                        stats["errors"].append(f)
+            stats["pages"] += 1
+            committed.add(offset)
+            if watermark in committed:
+                while watermark in committed:
+                    committed.discard(watermark)
+                    watermark += PAGE_SIZE
+                await _save_checkpoint(posted_from, posted_to, watermark)
+            if on_progress:
+                await on_progress(stats)
+        await producer
+    except BaseException:
+        producer.cancel()
+        raise
+
+
+async def _refresh_feeds(changed: set[str], stats: dict):
+    """Merge a window's written opportunities into company feeds. Failures are logged, not raised:
+    the opportunities are already committed and the next profile rebuild catches the feed up."""
+    if not changed:
+        return
+    try:
+        stats["feedsUpdated"] += await recommendations.refresh_for_opportunities(changed)
+    except Exception:
+        logger.exception("[SYNC] Recommendation refresh failed for %d notices", len(changed))
+
+
+async def run_sync(window: str | None = None, on_progress: Optional[ProgressCallback] = None):
+    """
+    Pull opportunities posted since lastSync into Mongo.
+    window="day"|"week" splits the range into sub-windows that commit (and advance
+    lastSync) independently. Progress is checkpointed per page, so a failed run
+    resumes from the last committed page of the window it stopped in.
+    on_progress, if given, is awaited with the running stats after every page.
+    """
     api_key = os.getenv("SAM_API_KEY")
     if not api_key:
         raise ValueError("SAM_API_KEY not set")
+    window = window or os.getenv("SYNC_WINDOW") or None
 
     await ensure_indexes()
-    last_sync = await _ensure_last_sync()
+    await recommendations.ensure_indexes()
+    await opportunity_stats.ensure_indexes()
+    meta = await _ensure_last_sync()
+    last_sync = meta["lastSync"]
+    checkpoint = meta.get("checkpoint")
     now = datetime.now(timezone.utc)
-    now_str = now.strftime("%m/%d/%Y")
 
     try:
-        last_d = datetime.strptime(last_sync, "%m/%d/%Y").replace(tzinfo=timezone.utc)
+        last_d = datetime.strptime(last_sync, DATE_FMT).replace(tzinfo=timezone.utc)
     except ValueError:
         last_d = now - timedelta(days=1)
     if (now - last_d).days > MAX_DAYS:
-        last_sync = (now - timedelta(days=MAX_DAYS)).strftime("%m/%d/%Y")
-
-    total = 0
-    offset = 0
-
-    async with httpx.AsyncClient(timeout=60) as client:
-        while True:
-            res = await client.get(
-                BASE,
-                params={
-                    "api_key": api_key,
-                    "postedFrom": last_sync,
-                    "postedTo": now_str,
-                    "limit": LIMIT,
-                    "offset": offset,
-                },
-            )
-            res.raise_for_status()
-            data = res.json().get("opportunitiesData", [])
-            if not data:
-                break
-            for opp in data:
+        last_d = now - timedelta(days=MAX_DAYS)
+
+    # An interrupted window is finished first, with its original bounds, from its
+    # committed offset; new windows then continue from where it ends.
+    windows = []
+    if checkpoint:
+        windows.append((checkpoint["postedFrom"], checkpoint["postedTo"], checkpoint["offset"]))
+        last_d = max(last_d, datetime.strptime(checkpoint["postedTo"], DATE_FMT).replace(tzinfo=timezone.utc))
+    windows += [(f, t, 0) for f, t in _split_windows(last_d, now, window)]
+
+    stats = {
+        "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "pages": 0, "windows": 0,
+        "feedsUpdated": 0, "errors": [],
+    }
+    started = time.perf_counter()
+
+    async with SamSearchClient(api_key) as sam:
+        for posted_from, posted_to, offset in windows:
+            changed: set[str] = set()
+            for attempt in range(WINDOW_RETRIES + 1):
                 try:
-                    await upsert_opportunity(_to_opp(opp))
-                    total += 1
-                except Exception:
-                    pass
-            if len(data) < LIMIT:
-                break
-            offset += LIMIT
+                    await _sync_window(sam, posted_from, posted_to, offset, stats, changed, on_progress)
+                    break
+                except httpx.HTTPError as e:
+                    if attempt == WINDOW_RETRIES:
+                        raise
+                    logger.warning("[SYNC] Window %s-%s failed (%s); retrying from checkpoint", posted_from, posted_to, e)
+                    cp = (await db["meta"].find_one({"_id": META_KEY}) or {}).get("checkpoint") or {}
+                    if cp.get("postedFrom") == posted_from and cp.get("postedTo") == posted_to:
+                        offset = cp["offset"]
+            await _finish_window(posted_to)
+            stats["windows"] += 1
+            await _refresh_feeds(changed, stats)
 
-    await db["meta"].update_one(
-        {"_id": META_KEY},
-        {"$set": {"lastSync": now_str}},
-        upsert=True,
-    )
-    return total
+    elapsed = time.perf_counter() - started
+    synced = stats["inserted"] + stats["updated"] + stats["unchanged"]
+    return {
+        "synced": synced,
+        **stats,
+        "seconds": round(elapsed, 2),
+        "recordsPerSec": round(synced / elapsed, 1) if elapsed > 0 else 0.0,
+    }